@@ -2,6 +2,8 @@
 import os
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from openai import OpenAI
 
 def read_file(file_path):
@@ -9,6 +11,20 @@ def read_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
+def get_response_file_path(segment_name, output_folder):
+    """
+    Get the path of the raw response file for a segment
+    
+    Args:
+        segment_name: Name of the segment file
+        output_folder: Directory where response files are stored
+        
+    Returns:
+        str: Path to the response file
+    """
+    # Use the segment file name without extension for a cleaner response filename
+    return os.path.join(output_folder, f"{Path(segment_name).stem}_response.txt")
+
 def save_response_to_file(response_text, segment_name, output_folder):
     """
     Save the raw API response to a file
@@ -21,17 +37,42 @@ def save_response_to_file(response_text, segment_name, output_folder):
     # Create a responses directory if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
     
-    # Get basename and remove extension for cleaner response filename
-    segment_basename = os.path.basename(segment_name)
-    segment_name_without_ext = os.path.splitext(segment_basename)[0]
-    
     # Save the response to a file
-    response_file = os.path.join(output_folder, f"{segment_name_without_ext}_response.txt")
+    response_file = get_response_file_path(segment_name, output_folder)
     with open(response_file, 'w', encoding='utf-8') as f:
         f.write(response_text)
     
     print(f"Saved raw response to {response_file}")
 
+def extract_json_list(response_text):
+    """
+    Find the first JSON array of suggestion objects in a model response
+    
+    The response may wrap the JSON in markdown code fences or surround it with
+    other text, so each '[' is tried in turn until one starts a valid JSON array
+    whose items are all objects. Arrays of anything else, like a "[2]" in prose or
+    the tags inside an object that failed to decode, are skipped.
+    
+    Args:
+        response_text: The raw response text from the API
+        
+    Returns:
+        list: The parsed array of dictionaries, or None if the response contains no such array
+    """
+    decoder = json.JSONDecoder()
+    json_start = response_text.find('[')
+    
+    while json_start != -1:
+        try:
+            value, _ = decoder.raw_decode(response_text, json_start)
+            if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+                return value
+        except json.JSONDecodeError:
+            pass
+        json_start = response_text.find('[', json_start + 1)
+    
+    return None
+
 def get_segment_suggestions(client, segment_content, system_prompt, segment_name, output_folder):
     """
     Call AI model API to get suggestions for a segment
@@ -54,34 +95,26 @@ def get_segment_suggestions(client, segment_content, system_prompt, segment_name
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Here is the subtitle segment:\n\n{segment_content}"}
             ],
-            stream=False,
+            stream=True,
             temperature=1.5,
         )
         
-        # Extract the response
-        response_text = response.choices[0].message.content
+        # Collect the streamed response; the tokens are read as they are generated
+        # instead of the connection sitting idle until the whole completion is ready
+        response_text = "".join(chunk.choices[0].delta.content or "" for chunk in response if chunk.choices)
         
         # Save the raw response to a file
         save_response_to_file(response_text, segment_name, output_folder)
         
         # Try to extract JSON from the response
-        json_start = response_text.find('[')
-        json_end = response_text.rfind(']') + 1
-        
-        if json_start != -1 and json_end != -1:
-            json_str = response_text[json_start:json_end]
-            try:
-                suggestions = json.loads(json_str)
-                return suggestions
-            except json.JSONDecodeError:
-                print("Failed to parse JSON from the response. Raw response:")
-                print(response_text)
-                return []
-        else:
-            print("No JSON found in the response. Raw response:")
+        suggestions = extract_json_list(response_text)
+        if suggestions is None:
+            print("No valid JSON found in the response. Raw response:")
             print(response_text)
             return []
         
+        return suggestions
+        
     except Exception as e:
         print(f"Error calling AI API: {e}")
         return []
@@ -98,12 +131,7 @@ def response_file_exists(segment_name, output_folder):
         bool: True if the file exists, False otherwise
         str: Path to the response file if it exists, None otherwise
     """
-    
-    # Get basename and remove extension for cleaner response filename
-    segment_basename = os.path.basename(segment_name)
-    segment_name_without_ext = os.path.splitext(segment_basename)[0]
-    
-    response_file = os.path.join(output_folder, f"{segment_name_without_ext}_response.txt")
+    response_file = get_response_file_path(segment_name, output_folder)
     
     if os.path.isfile(response_file):
         return True, response_file
@@ -124,20 +152,12 @@ def extract_suggestions_from_response_file(response_file):
         response_text = read_file(response_file)
         
         # Try to extract JSON from the response
-        json_start = response_text.find('[')
-        json_end = response_text.rfind(']') + 1
-        
-        if json_start != -1 and json_end != -1:
-            json_str = response_text[json_start:json_end]
-            try:
-                suggestions = json.loads(json_str)
-                return suggestions
-            except json.JSONDecodeError:
-                print(f"Failed to parse JSON from the response file: {response_file}")
-                return []
-        else:
-            print(f"No JSON found in the response file: {response_file}")
+        suggestions = extract_json_list(response_text)
+        if suggestions is None:
+            print(f"No valid JSON found in the response file: {response_file}")
             return []
+        
+        return suggestions
     except Exception as e:
         print(f"Error reading response file {response_file}: {e}")
         return []
@@ -163,7 +183,38 @@ def check_final_output_exists(suggestion_output):
             pass
     return False
 
-def process_segments(segment_folder, system_prompt_file, output_folder, suggestion_output, api_key):
+def get_suggestions_for_segment(client, segment_file, system_prompt, output_folder, segment_index, total_segments):
+    """
+    Get the suggestions for one segment, reusing its saved response if there is one
+    
+    Args:
+        client: OpenAI client instance
+        segment_file: Path to the segment file
+        system_prompt: The system prompt to use
+        output_folder: Directory where response files are stored
+        segment_index: 1-based position of the segment, for the progress output
+        total_segments: Total number of segments, for the progress output
+        
+    Returns:
+        list: List of suggestions
+    """
+    segment_basename = os.path.basename(segment_file)
+    print(f"Processing segment {segment_index}/{total_segments}: {segment_basename}")
+    
+    # Check if response file already exists
+    response_exists, response_file = response_file_exists(segment_file, output_folder)
+    
+    if response_exists:
+        print(f"Response file already exists for segment {segment_basename}. Skipping API call.")
+        return extract_suggestions_from_response_file(response_file)
+    
+    # Read segment content
+    segment_content = read_file(segment_file)
+    
+    # Get suggestions
+    return get_segment_suggestions(client, segment_content, system_prompt, segment_file, output_folder)
+
+def process_segments(segment_folder, system_prompt_file, output_folder, suggestion_output, api_key, max_concurrency=8):
     """
     Process each segment file and generate suggestions
     
@@ -173,6 +224,7 @@ def process_segments(segment_folder, system_prompt_file, output_folder, suggesti
         output_folder: Folder to store the AI model raw outputs
         suggestion_output: File to store the final JSON output
         api_key: AI model API key
+        max_concurrency: Maximum number of API requests in flight at once (default: 8)
         
     Returns:
         bool: True if processing was successful, False if an error occurred
@@ -198,32 +250,27 @@ def process_segments(segment_folder, system_prompt_file, output_folder, suggesti
             print(f"No segment files found in directory: {segment_folder}")
             return False
         
-        # Process each segment
-        all_suggestions = []
-        
-        for i, segment_file in enumerate(segment_files):
-            print(f"Processing segment {i+1}/{len(segment_files)}: {os.path.basename(segment_file)}")
+        # Request the segments concurrently, the API calls are network-bound.
+        # map() returns the results in segment order, so the output is unchanged.
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            segment_suggestions = executor.map(
+                lambda segment_file, segment_index: get_suggestions_for_segment(
+                    client, segment_file, system_prompt, output_folder, segment_index, len(segment_files)
+                ),
+                segment_files,
+                range(1, len(segment_files) + 1)
+            )
             
-            # Check if response file already exists
-            response_exists, response_file = response_file_exists(segment_file, output_folder)
-            
-            if response_exists:
-                print(f"Response file already exists for segment {os.path.basename(segment_file)}. Skipping API call.")
-                suggestions = extract_suggestions_from_response_file(response_file)
-            else:
-                # Read segment content
-                segment_content = read_file(segment_file)
+            all_suggestions = []
+            for i, (segment_file, suggestions) in enumerate(zip(segment_files, segment_suggestions)):
+                # Add segment information to each suggestion
+                segment_basename = os.path.basename(segment_file)
+                for suggestion in suggestions:
+                    suggestion["segment_file"] = segment_basename
+                    suggestion["segment_index"] = i + 1
                 
-                # Get suggestions
-                suggestions = get_segment_suggestions(client, segment_content, system_prompt, segment_file, output_folder)
-            
-            # Add segment information to each suggestion
-            for suggestion in suggestions:
-                suggestion["segment_file"] = os.path.basename(segment_file)
-                suggestion["segment_index"] = i + 1
-            
-            # Add to the combined list
-            all_suggestions.extend(suggestions)
+                # Add to the combined list
+                all_suggestions.extend(suggestions)
         
         # Create directory for suggestion output if needed
         os.makedirs(os.path.dirname(os.path.abspath(suggestion_output)), exist_ok=True)
@@ -248,6 +295,7 @@ def main():
     parser.add_argument("--output-folder", required=True, help="Folder to store the AI model raw outputs")
     parser.add_argument("--suggestion-output", required=True, help="File to store the final JSON output")
     parser.add_argument("--api-key", required=True, help="AI model API key")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Maximum number of API requests in flight at once (default: 8)")
     
     args = parser.parse_args()
     
@@ -257,7 +305,8 @@ def main():
         args.system_prompt_file,
         args.output_folder,
         args.suggestion_output,
-        args.api_key
+        args.api_key,
+        args.max_concurrency
     )
 
 if __name__ == "__main__":
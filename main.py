@@ -2,6 +2,7 @@ import subprocess
 import sys
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add both root and utils directories to Python path
@@ -11,21 +12,44 @@ sys.path.append(os.path.join(current_dir, "utils"))
 
 from utils.output_folder_creator import create_full_directory_structure, OutputFolder
 from utils.time_format import format_time
+from utils.video_writer import detect_hw_encoder
+from vertical_video_converter import process_folder as convert_to_vertical
+from video_subtitle_generator import SubtitleGenerator, process_folder as generate_subtitles
+from video_subtitle_embedder import process_videos as embed_subtitles
 
 python_path = sys.executable
 
-def execute_command(step_name: str, command: str):
+def execute_command(step_name: str, command: list):
     print(f"\n{'=' * 80}")
     print(f"STEP: {step_name}")
-    print(f"Command: {command}")
+    print(f"Command: {subprocess.list2cmdline(command)}")
     print("\n")
-    subprocess.run(command, shell=True)
+    subprocess.run(command)
     print(f"{'-' * 80}\n")
 
+def execute_step(step_name: str, func, *args, **kwargs):
+    print(f"\n{'=' * 80}")
+    print(f"STEP: {step_name}")
+    print(f"Function: {func.__module__}.{func.__name__}")
+    print("\n")
+    result = func(*args, **kwargs)
+    print(f"{'-' * 80}\n")
+    return result
+
 def run_podcast_clipper(youtube_urls: list):
     total_start_time = time.time()
     print(f"\nStarting processing of {len(youtube_urls)} videos at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    # Share one Whisper model across every video; it is loaded on first use
+    subtitle_generator = SubtitleGenerator(model_name="base", max_words_per_subtitle=8)
+    
+    # Pick the video encoder once (NVENC/QSV when available, otherwise libx264)
+    video_encoder = detect_hw_encoder()
+    
+    # Convert and subtitle several clips at once; capped at 4 to stay within the
+    # concurrent session limit of consumer NVENC GPUs
+    vertical_workers = min(4, max(1, (os.cpu_count() or 1) // 2))
+    
     for i, youtube_url in enumerate(youtube_urls, 1):
         video_start_time = time.time()
         print(f"\nProcessing video {i}/{len(youtube_urls)}: {youtube_url}")
@@ -34,44 +58,53 @@ def run_podcast_clipper(youtube_urls: list):
         # Create the full directory structure
         folders = create_full_directory_structure(youtube_url)
 
-        # Run the transcript downloader
-        yt_transcript_downloader_command = f"{python_path} yt_transcript_downloader.py {youtube_url} --output_folder {folders[OutputFolder.BASE]}"
-        execute_command(f"(Video {i} - 1/7) Downloading transcript", yt_transcript_downloader_command)
-
-        # Run the AI suggestion generator
-        api_key = os.getenv('DEEPSEEK_API_KEY')
-        suggestion_json_file = os.path.join(folders[OutputFolder.SEGMENTS_RESPONSE], "suggestions.json")
-        prompt_file = os.path.join(current_dir, "prompt", "short_podcast.txt")
-        segment_generator_command = f"{python_path} ai_suggestion_generator.py --segment-folder {folders[OutputFolder.SEGMENTS_INPUT]} --system-prompt-file {prompt_file} --output-folder {folders[OutputFolder.SEGMENTS_RESPONSE]} --suggestion-output {suggestion_json_file} --api-key {api_key}"
-        execute_command(f"(Video {i} - 2/7) Generating segment suggestions", segment_generator_command)
-
-        # Run the video downloader
+        # Download the video in the background while the transcript and suggestions are prepared,
+        # both steps are network-bound and independent of each other
         downloaded_yt_video_file = os.path.join(folders[OutputFolder.VIDEO], "video.mp4")
-        video_downloader_command = f"{python_path} yt_video_downloader.py --youtube-url {youtube_url} --output-file {downloaded_yt_video_file}"
-        execute_command(f"(Video {i} - 3/7) Downloading video", video_downloader_command)
+        video_downloader_command = [python_path, "yt_video_downloader.py", "--youtube-url", youtube_url, "--output-file", downloaded_yt_video_file]
+        with ThreadPoolExecutor(max_workers=1) as video_download_executor:
+            video_download = video_download_executor.submit(execute_command, f"(Video {i} - 3/7) Downloading video", video_downloader_command)
+
+            # Run the transcript downloader
+            yt_transcript_downloader_command = [python_path, "yt_transcript_downloader.py", youtube_url, "--output_folder", folders[OutputFolder.BASE]]
+            execute_command(f"(Video {i} - 1/7) Downloading transcript", yt_transcript_downloader_command)
+
+            # Run the AI suggestion generator
+            api_key = os.getenv('DEEPSEEK_API_KEY') or ""
+            suggestion_json_file = os.path.join(folders[OutputFolder.SEGMENTS_RESPONSE], "suggestions.json")
+            prompt_file = os.path.join(current_dir, "prompt", "short_podcast.txt")
+            segment_generator_command = [
+                python_path, "ai_suggestion_generator.py",
+                "--segment-folder", folders[OutputFolder.SEGMENTS_INPUT],
+                "--system-prompt-file", prompt_file,
+                "--output-folder", folders[OutputFolder.SEGMENTS_RESPONSE],
+                "--suggestion-output", suggestion_json_file,
+                "--api-key", api_key
+            ]
+            execute_command(f"(Video {i} - 2/7) Generating segment suggestions", segment_generator_command)
+
+            # Wait for the video download to finish before clipping
+            video_download.result()
 
         # Run the suggested video clipper
         yt_clip_folder = folders[OutputFolder.VIDEO_CLIPS]
-        video_clipper_command = f"{python_path} video_suggestion_clipper.py {downloaded_yt_video_file} {suggestion_json_file} {yt_clip_folder} --remove-silence --start-ms 0 --end-ms 3000"
+        video_clipper_command = [python_path, "video_suggestion_clipper.py", downloaded_yt_video_file, suggestion_json_file, yt_clip_folder, "--remove-silence", "--start-ms", "0", "--end-ms", "3000"]
         execute_command(f"(Video {i} - 4/7) Clipping video", video_clipper_command)
 
         # Run the vertical video converter
         vertical_video_folder = folders[OutputFolder.VERTICAL_CLIPS]
-        vertical_video_converter_command = f"{python_path} vertical_video_converter.py {yt_clip_folder} --output_folder {vertical_video_folder}"
-        execute_command(f"(Video {i} - 5/7) Converting video to vertical", vertical_video_converter_command)
+        execute_step(f"(Video {i} - 5/7) Converting video to vertical", convert_to_vertical, yt_clip_folder, vertical_video_folder, encoder=video_encoder, workers=vertical_workers)
 
         # Run subtitle generator
         clip_subtitles_folder = folders[OutputFolder.CLIP_SUBTITLES]
-        subtitle_generator_command = f"{python_path} video_subtitle_generator.py {vertical_video_folder} --output_folder {clip_subtitles_folder} --word_timings"
-        execute_command(f"(Video {i} - 6/7) Generating subtitles", subtitle_generator_command)
+        execute_step(f"(Video {i} - 6/7) Generating subtitles", generate_subtitles, vertical_video_folder, clip_subtitles_folder, generate_word_timings=True, subtitle_generator=subtitle_generator)
 
         # Attach subtitles to the vertical video
         subtitled_video_folder = folders[OutputFolder.SUBTITLED_CLIPS]
         highlight_style = "bigword" # "bigword"
         animation_style = "scale" # "bounce"
-        subtitled_video_converter_command = f"{python_path} video_subtitle_embedder.py {vertical_video_folder} {clip_subtitles_folder} --output_folder {subtitled_video_folder}"
-        # subtitled_video_converter_command = f"{python_path} video_subtitle_embedder.py {vertical_video_folder} {clip_subtitles_folder} --output_folder {subtitled_video_folder} --highlight {highlight_style} --animation {animation_style}"
-        execute_command(f"(Video {i} - 7/7) Attaching subtitles", subtitled_video_converter_command)
+        execute_step(f"(Video {i} - 7/7) Attaching subtitles", embed_subtitles, vertical_video_folder, clip_subtitles_folder, subtitled_video_folder, animation_style=animation_style, encoder=video_encoder, workers=vertical_workers)
+        # execute_step(f"(Video {i} - 7/7) Attaching subtitles", embed_subtitles, vertical_video_folder, clip_subtitles_folder, subtitled_video_folder, highlight_style=highlight_style, animation_style=animation_style, encoder=video_encoder, workers=vertical_workers)
 
         # Calculate and display time taken for this video
         video_end_time = time.time()
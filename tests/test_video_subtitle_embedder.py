@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_subtitle_embedder import SubtitleEntry, SubtitleProcessor
+
+
+class WriteAssFileTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.processor = SubtitleProcessor(self.temp_dir.name, self.temp_dir.name, os.path.join(self.temp_dir.name, "out"))
+        self.ass_path = os.path.join(self.temp_dir.name, "subtitles.ass")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_dialogue(self, text):
+        self.processor._write_ass_file([SubtitleEntry(1, 1.0, 2.5, text)], 1080, 1920, self.ass_path)
+        with open(self.ass_path, encoding="utf-8") as f:
+            dialogues = [line for line in f.read().splitlines() if line.startswith("Dialogue:")]
+        self.assertEqual(len(dialogues), 1)
+        return dialogues[0]
+
+    def test_backslashes_are_not_ass_escapes(self):
+        dialogue = self.write_dialogue("C:\\path\\Next \\N and {\\b1}bold")
+        self.assertTrue(dialogue.endswith(",C:\uff3cpath\uff3cNext \uff3cN and (\uff3cb1)bold"))
+        self.assertNotIn("\\", dialogue)
+
+    def test_line_breaks_become_ass_line_breaks(self):
+        dialogue = self.write_dialogue("first line\nsecond line")
+        self.assertTrue(dialogue.endswith(",first line\\Nsecond line"))
+
+    def test_timestamps(self):
+        dialogue = self.write_dialogue("text")
+        self.assertTrue(dialogue.startswith("Dialogue: 0,0:00:01.00,0:00:02.50,Default,"))
+
+
+if __name__ == "__main__":
+    unittest.main()
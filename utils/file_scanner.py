@@ -0,0 +1,32 @@
+import os
+from typing import Iterable, Iterator
+
+def scan_files(folder: str, extensions: Iterable[str]) -> Iterator[str]:
+    """
+    Recursively find files with one of the given extensions.
+    
+    Uses os.scandir, whose directory entries already carry the file type,
+    and a set lookup on the lowercased extension of each file name.
+    
+    Args:
+        folder: Folder to search
+        extensions: File extensions to match, e.g. [".mp4", ".mov"] (case-insensitive)
+        
+    Yields:
+        str: Path of each matching file, files of a folder before those of its subfolders
+    """
+    extension_set = {ext.lower() for ext in extensions}
+    
+    def walk(directory: str) -> Iterator[str]:
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in extension_set:
+                    yield entry.path
+        
+        for subdirectory in subdirectories:
+            yield from walk(subdirectory)
+    
+    return walk(folder)
@@ -37,10 +37,14 @@ def create_directory_structure(base_folder: str) -> dict:
         OutputFolder.SUBTITLED_CLIPS: os.path.join(base_folder, "video", "subtitled_clips")
     }
     
-    # Create each folder
-    for folder in folders.values():
+    # Only create the innermost folders, os.makedirs creates their parents along the way
+    leaf_folders = [
+        folder for folder in folders.values()
+        if not any(other.startswith(folder + os.sep) for other in folders.values())
+    ]
+    for folder in leaf_folders:
         os.makedirs(folder, exist_ok=True)
-        print(f"Created directory: {folder}")
+    print(f"Created directory structure in: {base_folder}")
     
     return folders
 
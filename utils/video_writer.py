@@ -0,0 +1,191 @@
+import os
+import subprocess
+from functools import lru_cache
+
+# Hardware encoders in order of preference, with the preset used for each
+HW_ENCODERS = {
+    "h264_nvenc": "p4",
+    "h264_qsv": "veryfast",
+}
+SOFTWARE_ENCODER = "libx264"
+SOFTWARE_PRESET = "veryfast"
+
+def _encoder_works(encoder: str) -> bool:
+    """
+    Check that FFmpeg can actually encode with the given encoder on this machine.
+
+    Args:
+        encoder: FFmpeg encoder name
+
+    Returns:
+        bool: True if a short test encode succeeded, False otherwise
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=black:size=256x256:duration=0.1",
+        "-c:v", encoder,
+        "-f", "null", "-"
+    ]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except FileNotFoundError:
+        return False
+
+@lru_cache(maxsize=None)
+def detect_hw_encoder() -> str:
+    """
+    Detect the fastest H.264 encoder available to FFmpeg.
+
+    The result is cached so the detection only runs once per process.
+
+    Returns:
+        str: "h264_nvenc", "h264_qsv" or "libx264"
+    """
+    try:
+        encoders = subprocess.check_output(["ffmpeg", "-hide_banner", "-encoders"], stderr=subprocess.DEVNULL)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return SOFTWARE_ENCODER
+
+    for encoder in HW_ENCODERS:
+        # The encoder can be compiled in without a matching GPU, so try it before using it
+        if encoder.encode() in encoders and _encoder_works(encoder):
+            print(f"Using hardware video encoder: {encoder}")
+            return encoder
+
+    print(f"No hardware video encoder available, using {SOFTWARE_ENCODER}")
+    return SOFTWARE_ENCODER
+
+def _audio_codec(media_file: str) -> str:
+    """
+    Get the codec of the first audio track of a media file.
+
+    Args:
+        media_file: Path to the media file
+
+    Returns:
+        str: Codec name as reported by ffprobe (e.g. "aac"), or None if unknown
+    """
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name",
+        "-of", "csv=p=0",
+        media_file
+    ]
+    try:
+        return subprocess.check_output(cmd, stderr=subprocess.DEVNULL).decode().strip() or None
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+class FFmpegVideoWriter:
+    """
+    Drop-in replacement for cv2.VideoWriter that pipes raw BGR (or RGB) frames into an FFmpeg encoder.
+    """
+
+    def __init__(self, output_file: str, fps: float, frame_size: tuple, encoder: str = None, audio_file: str = None, pixel_format: str = "bgr24"):
+        """
+        Start the FFmpeg encoder process.
+
+        Args:
+            output_file: Path of the video file to write
+            fps: Frames per second of the output video
+            frame_size: (width, height) of the frames that will be written
+            encoder: FFmpeg video encoder to use (default: detected with detect_hw_encoder)
+            audio_file: File whose first audio track is muxed into the output as AAC while the
+                frames are encoded (default: None, the output has no audio)
+            pixel_format: Channel layout of the written frames, "bgr24" (OpenCV) or "rgb24" (default: bgr24)
+        """
+        self.encoder = encoder or detect_hw_encoder()
+        width, height = frame_size
+
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo",
+            "-pix_fmt", pixel_format,
+            "-s", f"{width}x{height}",
+            "-r", str(fps),
+            "-i", "pipe:0"
+        ]
+        if audio_file:
+            # AAC audio is copied as-is, anything else is encoded to AAC.
+            # The "?" keeps inputs without an audio track from failing the encode
+            audio_codec = "copy" if _audio_codec(audio_file) == "aac" else "aac"
+            cmd += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0?", "-c:a", audio_codec, "-shortest"]
+        else:
+            cmd += ["-an"]
+        cmd += [
+            "-c:v", self.encoder,
+            "-preset", HW_ENCODERS.get(self.encoder, SOFTWARE_PRESET),
+            "-pix_fmt", "yuv420p",
+            output_file
+        ]
+        self.cmd = cmd
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def isOpened(self) -> bool:
+        return self.process.poll() is None
+
+    def write(self, frame):
+        # Hand contiguous frames to the pipe without copying them into a bytes object first
+        self.process.stdin.write(frame.data if frame.flags.c_contiguous else frame.tobytes())
+
+    def release(self):
+        """
+        Finish the encode and wait for FFmpeg to exit.
+
+        Raises:
+            subprocess.CalledProcessError: If FFmpeg failed, so a broken file is never used as output
+        """
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                # FFmpeg already exited, its return code tells why
+                pass
+        if self.process.wait() != 0:
+            raise subprocess.CalledProcessError(self.process.returncode, self.cmd)
+
+@lru_cache(maxsize=None)
+def has_ass_filter() -> bool:
+    """
+    Check whether FFmpeg was built with libass and can burn in subtitles.
+
+    Returns:
+        bool: True if the "ass" video filter is available, False otherwise
+    """
+    try:
+        filters = subprocess.check_output(["ffmpeg", "-hide_banner", "-filters"], stderr=subprocess.DEVNULL)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+    return b" ass " in filters
+
+def filter_video(input_file: str, output_file: str, video_filter: str, encoder: str = None, cwd: str = None):
+    """
+    Run a video file through an FFmpeg filter graph in a single decode/filter/encode pass.
+
+    The first audio track is copied when it is AAC and encoded to AAC otherwise.
+
+    Args:
+        input_file: Path of the video file to read
+        output_file: Path of the video file to write
+        video_filter: FFmpeg "-vf" filter graph
+        encoder: FFmpeg video encoder to use (default: detected with detect_hw_encoder)
+        cwd: Working directory for FFmpeg, used to resolve relative paths in the filter graph
+
+    Raises:
+        subprocess.CalledProcessError: If FFmpeg fails
+    """
+    encoder = encoder or detect_hw_encoder()
+    audio_codec = "copy" if _audio_codec(input_file) == "aac" else "aac"
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", os.path.abspath(input_file),
+        "-map", "0:v:0", "-map", "0:a:0?",
+        "-vf", video_filter,
+        "-c:v", encoder,
+        "-preset", HW_ENCODERS.get(encoder, SOFTWARE_PRESET),
+        "-pix_fmt", "yuv420p",
+        "-c:a", audio_codec,
+        os.path.abspath(output_file)
+    ]
+    subprocess.run(cmd, cwd=cwd, check=True)
@@ -2,9 +2,18 @@ import yt_dlp
 import urllib.parse
 import time
 import re
+import os
+import json
+import tempfile
 from typing import Optional
 import argparse
 
+# Characters that can't be used in a folder name (anything except word characters, whitespace
+# and dashes) and runs of whitespace; each match is replaced with a single underscore
+_UNSAFE_TITLE_CHARS = re.compile(r'[^\w\s-]|\s+')
+
+# Video titles already looked up, keyed by video ID, so re-runs don't query YouTube again
+TITLE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "podcast_clipper", "titles.json")
 
 def extract_video_id(url: str) -> Optional[str]:
     """
@@ -64,6 +73,42 @@ def get_video_info(youtube_url):
         print(f"Error extracting video info: {str(e)}")
         return None
     
+def _load_title_cache() -> dict:
+    """
+    Load the cached video titles.
+    
+    Returns:
+        dict: Video titles keyed by video ID (empty if there is no readable cache)
+    """
+    try:
+        with open(TITLE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _cache_title(video_id: str, title: str):
+    """
+    Add a video title to the title cache.
+    
+    The cache is written to a temporary file and then moved into place, so a
+    concurrent run never reads a half-written file.
+    
+    Args:
+        video_id (str): The YouTube video ID
+        title (str): The original (unsanitized) video title
+    """
+    try:
+        titles = _load_title_cache()
+        titles[video_id] = title
+        
+        cache_dir = os.path.dirname(TITLE_CACHE_FILE)
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump(titles, f, indent=2)
+        os.replace(f.name, TITLE_CACHE_FILE)
+    except OSError as e:
+        print(f"Could not update the video title cache: {str(e)}")
+
 def get_video_title(youtube_url: str) -> str:
     """
     Get the title of a YouTube video.
@@ -80,16 +125,18 @@ def get_video_title(youtube_url: str) -> str:
         return f"youtube_video_{int(time.time())}"
     
     try:
-        # Use yt_video_downloader's functionality to get video info
-        video_info = get_video_info(youtube_url)
-        if video_info and 'title' in video_info:
-            title = video_info['title']
-        else:
-            return f"youtube_video_{video_id}"
+        title = _load_title_cache().get(video_id)
+        if title is None:
+            # Use yt_video_downloader's functionality to get video info
+            video_info = get_video_info(youtube_url)
+            if video_info and 'title' in video_info:
+                title = video_info['title']
+                _cache_title(video_id, title)
+            else:
+                return f"youtube_video_{video_id}"
         
         # Sanitize title for use as folder name
-        sanitized_title = re.sub(r'[^\w\s-]', '_', title)  # Replace non-alphanumeric chars except whitespace and dash
-        sanitized_title = re.sub(r'\s+', '_', sanitized_title)  # Replace whitespace with underscore
+        sanitized_title = _UNSAFE_TITLE_CHARS.sub('_', title)
         
         return sanitized_title
     
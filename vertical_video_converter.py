@@ -1,16 +1,27 @@
+import av
 import cv2
 import mediapipe as mp
+import numpy as np
 import argparse
 import os
 import random
 import time
-import subprocess
+import shutil
 import tempfile
 import glob
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Tuple, Optional
 
+from utils.video_writer import FFmpegVideoWriter, detect_hw_encoder
+
+# Longest side, in pixels, of the frames passed to pose detection
+POSE_INPUT_SIZE = 512
+
 class VerticalVideoClipper:
-    def __init__(self, input_file: str, output_file: str, width: int = 1080, height: int = 1920):
+    def __init__(self, input_file: str, output_file: str, width: int = 1080, height: int = 1920, encoder: str = None, pose_complexity: int = 0, pose_stride: int = 3, detector: str = "pose"):
         """
         Initialize the VerticalVideoClipper.
         
@@ -19,51 +30,101 @@ class VerticalVideoClipper:
             output_file: Path where the output vertical video will be saved
             width: Width of the output vertical video (default: 1080)
             height: Height of the output vertical video (default: 1920)
+            encoder: FFmpeg video encoder (default: best available, e.g. h264_nvenc)
+            pose_complexity: MediaPipe Pose model complexity, 0 (lite, fastest), 1 (full) or 2 (heavy) (default: 0)
+            pose_stride: Run person detection on every n-th frame and reuse the result in between (default: 3)
+            detector: How to find the person, "pose" (center of the MediaPipe Pose landmarks) or
+                "face" (center of the most confident MediaPipe face detection, much faster) (default: pose)
         """
         self.input_file = input_file
         self.output_file = output_file
-        self.temp_video_file = os.path.join(tempfile.gettempdir(), f"temp_vertical_video_{int(time.time())}.mp4")
         self.output_width = width
         self.output_height = height
+        self.pose_stride = max(1, pose_stride)
         
         # Initialize video capture
-        self.cap = cv2.VideoCapture(input_file)
-        if not self.cap.isOpened():
+        # Decode with PyAV; "AUTO" lets FFmpeg decode with frame and slice threads
+        try:
+            self.container = av.open(input_file)
+        except (av.error.FFmpegError, OSError):
             raise ValueError(f"Could not open video file: {input_file}")
-        
-        # Get video properties
-        self.input_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        self.input_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # Initialize MediaPipe for person detection
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            enable_segmentation=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Calculate crop dimensions while maintaining aspect ratio
-        # First determine the vertical crop height (same as input height)
-        self.crop_height = self.input_height
-        
-        # Calculate the width needed to maintain 9:16 aspect ratio
-        self.crop_width = int(self.crop_height * (self.output_width / self.output_height))
-        
-        # If calculated crop width is larger than input width, adjust both dimensions
-        if self.crop_width > self.input_width:
-            self.crop_width = self.input_width
-            self.crop_height = int(self.crop_width * (self.output_height / self.output_width))
+        if not self.container.streams.video:
+            self.container.close()
+            raise ValueError(f"Could not open video file: {input_file}")
+        self.video_stream = self.container.streams.video[0]
+        self.temp_video_file = None
+        self.person_detector = None
+        try:
+            self.video_stream.thread_type = "AUTO"
+            
+            # Get video properties
+            self.input_width = self.video_stream.codec_context.width
+            self.input_height = self.video_stream.codec_context.height
+            self.fps = float(self.video_stream.average_rate)
+            self.total_frames = self.video_stream.frames
+            if not self.total_frames and self.container.duration:
+                # Frame count not stored in the container, estimate it from the duration
+                self.total_frames = int(self.container.duration / av.time_base * self.fps)
+            self.total_frames = max(1, self.total_frames)
+            
+            # The crop spans the full frame height and is resized to the output height anyway,
+            # so let the decoder scale taller input (e.g. 4K) down to the output height while it
+            # converts to RGB, instead of moving the full resolution frames through every stage
+            self.decode_size = None
+            if self.input_height > self.output_height:
+                decode_width = int(self.input_width * self.output_height / self.input_height) // 2 * 2
+                self.decode_size = (decode_width, self.output_height)
+                self.input_width, self.input_height = self.decode_size
             
-        # Initialize video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        self.out = cv2.VideoWriter(
-            self.temp_video_file, fourcc, self.fps, (self.output_width, self.output_height)
-        )
+            # Initialize MediaPipe for person detection
+            if detector == "face":
+                # Only a detector, no landmark model; the full-range model also finds smaller faces in wide shots
+                self.person_detector = mp.solutions.face_detection.FaceDetection(
+                    model_selection=1,
+                    min_detection_confidence=0.5
+                )
+            else:
+                # Only the center of the visible landmarks is used, so the lite model is accurate enough by default
+                self.person_detector = mp.solutions.pose.Pose(
+                    static_image_mode=False,
+                    model_complexity=pose_complexity,
+                    # The crop center is smoothed in process(), MediaPipe's landmark filter would only add lag
+                    smooth_landmarks=False,
+                    enable_segmentation=False,
+                    min_detection_confidence=0.5,
+                    min_tracking_confidence=0.5
+                )
+            self.detector = detector
+            
+            # Calculate crop dimensions while maintaining aspect ratio
+            # First determine the vertical crop height (same as input height)
+            self.crop_height = self.input_height
+            
+            # Calculate the width needed to maintain 9:16 aspect ratio
+            self.crop_width = int(self.crop_height * (self.output_width / self.output_height))
+            
+            # If calculated crop width is larger than input width, adjust both dimensions
+            if self.crop_width > self.input_width:
+                self.crop_width = self.input_width
+                self.crop_height = int(self.crop_width * (self.output_height / self.output_width))
+                
+            # Unique temporary file, several clippers can run at the same time in worker processes
+            temp_video_fd, self.temp_video_file = tempfile.mkstemp(prefix="temp_vertical_video_", suffix=".mp4")
+            os.close(temp_video_fd)
+            
+            # Initialize video writer (FFmpeg with hardware encoding when available), the audio
+            # of the input file is muxed in during the same encode
+            self.out = FFmpegVideoWriter(
+                self.temp_video_file, self.fps, (self.output_width, self.output_height), encoder, audio_file=input_file, pixel_format="rgb24"
+            )
+        except BaseException:
+            # Don't leave the input open or the temporary file behind when setup fails
+            self.container.close()
+            if self.person_detector is not None:
+                self.person_detector.close()
+            if self.temp_video_file is not None and os.path.exists(self.temp_video_file):
+                os.remove(self.temp_video_file)
+            raise
         
         # Variables for smooth camera movement
         self.last_crop_x = (self.input_width - self.crop_width) // 2  # Start in the middle
@@ -75,6 +136,7 @@ class VerticalVideoClipper:
         self.zoom_duration = 0
         self.zoom_step = 0
         self.frames_since_last_zoom = 0
+        self.zoom_wait = self._sample_zoom_wait()
         self.min_zoom = 1.0
         self.max_zoom = 1.1  # Reduced from 1.2 to 1.1 for subtler effect
         
@@ -83,33 +145,64 @@ class VerticalVideoClipper:
         Detect people in the frame and return the center point of the main person.
         
         Args:
-            frame: The input video frame
+            frame: The input video frame (RGB, as decoded by _read_frames)
             
         Returns:
             Tuple (x, y) of the center point of the main person, or None if no person is detected
         """
-        # Convert to RGB for MediaPipe
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(frame_rgb)
+        # Downscale large frames before passing them to MediaPipe. The pose models work on
+        # 256x256 crops, so full HD/4K input only adds resize work.
+        # The landmarks are normalized to [0, 1], so they map back to the full frame as-is.
+        scale = POSE_INPUT_SIZE / max(frame.shape[0], frame.shape[1])
+        if scale < 1:
+            small_frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            small_frame = frame
+        results = self.person_detector.process(small_frame)
+        
+        if self.detector == "face":
+            if results.detections:
+                # Center of the most confident face
+                detection = max(results.detections, key=lambda detection: detection.score[0])
+                box = detection.location_data.relative_bounding_box
+                center_x = int((box.xmin + box.width / 2) * frame.shape[1])
+                center_y = int((box.ymin + box.height / 2) * frame.shape[0])
+                return center_x, center_y
+            return None
         
         if results.pose_landmarks:
-            # Calculate the center point based on visible landmarks
-            visible_landmarks = []
-            for idx, landmark in enumerate(results.pose_landmarks.landmark):
-                # Only use landmarks with good visibility
-                if landmark.visibility > 0.5:
-                    x = int(landmark.x * frame.shape[1])
-                    y = int(landmark.y * frame.shape[0])
-                    visible_landmarks.append((x, y))
+            # Landmarks as rows of (x, y, visibility)
+            landmarks = np.fromiter(
+                (value for landmark in results.pose_landmarks.landmark for value in (landmark.x, landmark.y, landmark.visibility)),
+                dtype=np.float64
+            ).reshape(-1, 3)
             
-            if visible_landmarks:
-                # Calculate center of the person using the average of visible landmarks
-                center_x = sum(x for x, y in visible_landmarks) // len(visible_landmarks)
-                center_y = sum(y for x, y in visible_landmarks) // len(visible_landmarks)
-                return center_x, center_y
+            # Only use landmarks with good visibility
+            visible_landmarks = landmarks[landmarks[:, 2] > 0.5]
+            
+            if len(visible_landmarks):
+                # Calculate center of the person using the average of visible landmarks (in pixels)
+                xs = (visible_landmarks[:, 0] * frame.shape[1]).astype(int)
+                ys = (visible_landmarks[:, 1] * frame.shape[0]).astype(int)
+                return int(xs.sum()) // len(xs), int(ys.sum()) // len(ys)
                 
         return None
     
+    def _sample_zoom_wait(self) -> int:
+        """
+        Pick how many neutral frames pass before the next zoom starts.
+        
+        Same distribution as drawing random.randint(120, 300) on every neutral frame and
+        starting the zoom once the frame counter exceeds the draw (increased from 60-180),
+        but with one vectorized draw per zoom instead of one random call per frame.
+        
+        Returns:
+            Number of neutral frames before the next zoom
+        """
+        frame_numbers = np.arange(121, 302)
+        thresholds = np.random.randint(120, 301, size=len(frame_numbers))
+        return int(frame_numbers[np.argmax(frame_numbers > thresholds)])
+    
     def apply_zoom_effect(self, crop_x: int, crop_y: int, crop_width: int, crop_height: int) -> Tuple[int, int, int, int]:
         """
         Apply zoom effects to make the video more dynamic, but with reduced intensity.
@@ -128,7 +221,7 @@ class VerticalVideoClipper:
             self.frames_since_last_zoom += 1
             
             # Randomly start a new zoom after a longer period (reduced frequency)
-            if self.frames_since_last_zoom > random.randint(120, 300):  # Increased from 60-180 to 120-300
+            if self.frames_since_last_zoom >= self.zoom_wait:
                 self.zoom_state = random.choice(["zooming_in", "zooming_out"])
                 self.zoom_duration = random.randint(150, 210)  # Increased duration for smoother effect
                 
@@ -145,6 +238,7 @@ class VerticalVideoClipper:
                 self.zoom_state = "neutral"
                 self.zoom_factor = min(self.zoom_factor, self.max_zoom)
                 self.frames_since_last_zoom = 0
+                self.zoom_wait = self._sample_zoom_wait()
                 
         elif self.zoom_state == "zooming_out":
             self.zoom_factor += self.zoom_step
@@ -154,6 +248,7 @@ class VerticalVideoClipper:
                 self.zoom_state = "neutral"
                 self.zoom_factor = max(self.zoom_factor, self.min_zoom)
                 self.frames_since_last_zoom = 0
+                self.zoom_wait = self._sample_zoom_wait()
         
         # Apply zoom effect while maintaining aspect ratio
         adjusted_crop_width = int(crop_width / self.zoom_factor)
@@ -171,130 +266,243 @@ class VerticalVideoClipper:
         
         return adjusted_crop_x, adjusted_crop_y, adjusted_crop_width, adjusted_crop_height
     
-    def process(self):
-        """Process the input video and create a vertical video output with audio."""
+    def _read_frames(self, read_queue: queue.Queue, stop_event: threading.Event):
+        """
+        Decode frames from the input video into a queue, followed by None at the end.
+        
+        Frames are decoded straight to RGB, the channel order MediaPipe expects, and
+        are written to the encoder in RGB as well, so no BGR/RGB conversion is needed.
+        
+        Args:
+            read_queue: Bounded queue receiving the decoded frames
+            stop_event: Set by the processing thread to stop decoding early
+        """
+        try:
+            for frame in self.container.decode(self.video_stream):
+                if stop_event.is_set():
+                    break
+                if self.decode_size:
+                    width, height = self.decode_size
+                    read_queue.put(frame.to_ndarray(width=width, height=height, format="rgb24"))
+                else:
+                    read_queue.put(frame.to_ndarray(format="rgb24"))
+        except av.error.FFmpegError as e:
+            # Keep the frames decoded so far, like a truncated or damaged file
+            print(f"Error decoding {self.input_file}: {str(e)}")
+        finally:
+            read_queue.put(None)
+    
+    def _write_frames(self, write_queue: queue.Queue):
+        """
+        Encode frames from a queue until None is received.
+        
+        A write error is kept in self.write_error and the remaining frames are
+        discarded, so the processing thread never blocks on a full queue.
+        
+        Args:
+            write_queue: Bounded queue with the vertical frames to write
+        """
+        while True:
+            frame = write_queue.get()
+            if frame is None:
+                break
+            if self.write_error is None:
+                try:
+                    self.out.write(frame)
+                except Exception as e:
+                    self.write_error = e
+    
+    def process(self, prefetch: int = 16):
+        """
+        Process the input video and create a vertical video output with audio.
+        
+        Args:
+            prefetch: Maximum number of frames buffered between the stages (default: 16)
+        """
+        try:
+            self._convert_frames(prefetch)
+        except Exception:
+            # Don't leave a partial or failed encode behind
+            if os.path.exists(self.temp_video_file):
+                os.remove(self.temp_video_file)
+            raise
+        
+        # Move the finished video into place; the output only appears once it is complete,
+        # so an interrupted conversion isn't skipped as done on the next run
+        shutil.move(self.temp_video_file, self.output_file)
+        
+        print(f"Vertical video created successfully: {self.output_file}")
+    
+    def _convert_frames(self, prefetch: int):
+        """
+        Crop every frame of the input video and encode it into the temporary video file.
+        
+        Decoding and encoding run on their own threads, connected to the person
+        detection and cropping in this thread by bounded queues, so reading and
+        writing frames overlaps with the pose inference.
+        
+        Args:
+            prefetch: Maximum number of frames buffered between the stages
+            
+        Raises:
+            subprocess.CalledProcessError: If FFmpeg failed to encode the video
+        """
         frame_count = 0
+        person_center = None
         target_x = self.last_crop_x  # Start with center crop
         target_y = self.last_crop_y
         
-        while self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:
-                break
+        read_queue = queue.Queue(maxsize=prefetch)
+        write_queue = queue.Queue(maxsize=prefetch)
+        stop_event = threading.Event()
+        self.write_error = None
+        reader = threading.Thread(target=self._read_frames, args=(read_queue, stop_event), daemon=True)
+        writer = threading.Thread(target=self._write_frames, args=(write_queue,), daemon=True)
+        reader.start()
+        writer.start()
+        
+        # Reuse a ring of output frames instead of allocating a new one per frame. Up to `prefetch`
+        # frames wait in the write queue and one is being written, so a buffer is only reused
+        # after the frame it held has been written.
+        output_frames = [
+            np.empty((self.output_height, self.output_width, 3), dtype=np.uint8)
+            for _ in range(prefetch + 2)
+        ]
+        
+        try:
+            while True:
+                frame = read_queue.get()
+                if frame is None:
+                    break
                 
-            frame_count += 1
-            if frame_count % 100 == 0:
-                print(f"Processing frame {frame_count}/{self.total_frames} ({(frame_count/self.total_frames)*100:.1f}%)")
-            
-            # Detect person in the frame
-            person_center = self.detect_person(frame)
-            
-            if person_center:
-                # Calculate the target x position for cropping
-                center_x, center_y = person_center
+                frame_count += 1
+                if frame_count % 100 == 0:
+                    print(f"Processing frame {frame_count}/{self.total_frames} ({(frame_count/self.total_frames)*100:.1f}%)")
                 
-                # Make sure we don't go out of bounds with the crop
-                max_x = self.input_width - self.crop_width
-                max_y = self.input_height - self.crop_height
-                target_x = max(0, min(max_x, center_x - self.crop_width // 2))
-                target_y = max(0, min(max_y, center_y - self.crop_height // 2))
-            
-            # Apply smooth transition to target position (reduced smoothing factor for less movement)
-            smoothing_factor = 0.05  # Reduced from 0.1 to 0.05 for smoother, slower transitions
-            self.last_crop_x = int(self.last_crop_x * (1 - smoothing_factor) + target_x * smoothing_factor)
-            self.last_crop_y = int(self.last_crop_y * (1 - smoothing_factor) + target_y * smoothing_factor)
-            
-            # Apply zoom effect with maintained aspect ratio
-            crop_x, crop_y, crop_width, crop_height = self.apply_zoom_effect(
-                self.last_crop_x, self.last_crop_y, self.crop_width, self.crop_height
-            )
-            
-            # Make sure we don't go out of bounds after zoom
-            if crop_x < 0:
-                crop_x = 0
-            if crop_y < 0:
-                crop_y = 0
-            if crop_x + crop_width > self.input_width:
-                crop_x = self.input_width - crop_width
-            if crop_y + crop_height > self.input_height:
-                crop_y = self.input_height - crop_height
-            
-            # Crop the frame with proper aspect ratio
-            cropped_frame = frame[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width]
-            
-            # Resize to output dimensions
-            vertical_frame = cv2.resize(cropped_frame, (self.output_width, self.output_height))
+                # Detect person in the frame; in between detections the last position is reused,
+                # the crop smoothing below moves far slower than the detection rate anyway
+                if (frame_count - 1) % self.pose_stride == 0:
+                    person_center = self.detect_person(frame)
+                
+                if person_center:
+                    # Calculate the target x position for cropping
+                    center_x, center_y = person_center
+                
+                    # Make sure we don't go out of bounds with the crop
+                    max_x = self.input_width - self.crop_width
+                    max_y = self.input_height - self.crop_height
+                    target_x = max(0, min(max_x, center_x - self.crop_width // 2))
+                    target_y = max(0, min(max_y, center_y - self.crop_height // 2))
+                
+                # Apply smooth transition to target position (reduced smoothing factor for less movement)
+                smoothing_factor = 0.05  # Reduced from 0.1 to 0.05 for smoother, slower transitions
+                self.last_crop_x = int(self.last_crop_x * (1 - smoothing_factor) + target_x * smoothing_factor)
+                self.last_crop_y = int(self.last_crop_y * (1 - smoothing_factor) + target_y * smoothing_factor)
+                
+                # Apply zoom effect with maintained aspect ratio
+                crop_x, crop_y, crop_width, crop_height = self.apply_zoom_effect(
+                    self.last_crop_x, self.last_crop_y, self.crop_width, self.crop_height
+                )
+                
+                # Make sure we don't go out of bounds after zoom
+                crop_x = min(max(crop_x, 0), self.input_width - crop_width)
+                crop_y = min(max(crop_y, 0), self.input_height - crop_height)
+                
+                # Crop the frame with proper aspect ratio
+                cropped_frame = frame[crop_y:crop_y + crop_height, crop_x:crop_x + crop_width]
+                
+                # Resize to output dimensions
+                vertical_frame = output_frames[frame_count % len(output_frames)]
+                cv2.resize(cropped_frame, (self.output_width, self.output_height), dst=vertical_frame)
+                
+                # Hand the frame over to the writer thread
+                write_queue.put(vertical_frame)
+        finally:
+            # Stop the reader and unblock it if it is waiting on a full queue
+            stop_event.set()
+            while reader.is_alive():
+                try:
+                    read_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            write_queue.put(None)
+            writer.join()
             
-            # Write frame to output video
-            self.out.write(vertical_frame)
-        
-        # Clean up OpenCV resources
-        self.cap.release()
-        self.out.release()
-        self.pose.close()
+            # Clean up decoder, MediaPipe and encoder resources; releasing the encoder
+            # comes last as it raises if FFmpeg failed
+            self.container.close()
+            self.person_detector.close()
+            self.out.release()
         
-        # Add audio from the original file to the output
-        self._add_audio_to_video()
+        if self.write_error is not None:
+            raise self.write_error
+
+def _convert_video(video_file: str, output_path: str, width: int, height: int, encoder: str, pose_complexity: int, pose_stride: int, detector: str) -> bool:
+    """
+    Convert a single video to vertical format, used directly or from a worker process.
+    
+    Args:
+        video_file: Path to the input video file
+        output_path: Path where the vertical video will be saved
+        width: Output width
+        height: Output height
+        encoder: FFmpeg video encoder (None for the best available)
+        pose_complexity: MediaPipe Pose model complexity used to find the person
+        pose_stride: Run person detection on every n-th frame
+        detector: Person detector to use, "pose" or "face"
         
-        print(f"Vertical video created successfully: {self.output_file}")
+    Returns:
+        bool: True if the video was converted successfully, False otherwise
+    """
+    input_basename = os.path.basename(video_file)
+    print(f"\nProcessing video {input_basename}")
     
-    def _add_audio_to_video(self):
-        """Extract audio from input video and add it to the output video."""
-        try:
-            # Use FFmpeg to combine the video with the original audio
-            cmd = [
-                'ffmpeg',
-                '-i', self.temp_video_file,  # Video file
-                '-i', self.input_file,      # Original file with audio
-                '-c:v', 'copy',             # Copy video stream without re-encoding
-                '-c:a', 'aac',              # Audio codec
-                '-map', '0:v:0',            # Use video from first input
-                '-map', '1:a:0',            # Use audio from second input
-                '-shortest',                # Finish encoding when the shortest input stream ends
-                self.output_file            # Output file
-            ]
-            
-            print("Adding audio to the video...")
-            subprocess.run(cmd, check=True)
-            
-            # Remove the temporary file
-            if os.path.exists(self.temp_video_file):
-                os.remove(self.temp_video_file)
-                
-        except subprocess.CalledProcessError as e:
-            print(f"Error adding audio: {e}")
-            print("Saving video without audio...")
-            # If FFmpeg fails, just rename the temp file to the output file
-            if os.path.exists(self.temp_video_file):
-                os.rename(self.temp_video_file, self.output_file)
-        except FileNotFoundError:
-            print("FFmpeg not found. Please install FFmpeg to add audio to the video.")
-            print("Saving video without audio...")
-            # If FFmpeg is not installed, just rename the temp file to the output file
-            if os.path.exists(self.temp_video_file):
-                os.rename(self.temp_video_file, self.output_file)
+    try:
+        # Process video
+        start_time = time.time()
+        clipper = VerticalVideoClipper(video_file, output_path, width, height, encoder, pose_complexity, pose_stride, detector)
+        clipper.process()
+        end_time = time.time()
+        
+        print(f"Processing completed in {end_time - start_time:.2f} seconds")
+        return True
+    except Exception as e:
+        print(f"Error processing video {input_basename}: {str(e)}")
+        return False
 
-def main():
-    parser = argparse.ArgumentParser(description="Convert landscape videos to vertical format with focus on people")
-    parser.add_argument("input_folder", help="Path to folder containing input video files")
-    parser.add_argument("--output_folder", "-o", help="Path to output folder (optional)")
-    parser.add_argument("--width", type=int, default=1080, help="Output width (default: 1080)")
-    parser.add_argument("--height", type=int, default=1920, help="Output height (default: 1920)")
-    parser.add_argument("--extensions", nargs="+", default=[".mp4", ".avi", ".mov", ".mkv", ".webm"], help="Video file extensions to process (default: .mp4 .avi .mov .mkv .webm)")
-    args = parser.parse_args()
+def process_folder(input_folder: str, output_folder: str = None, width: int = 1080, height: int = 1920, extensions: list = None, encoder: str = None, pose_complexity: int = 0, pose_stride: int = 3, workers: int = 1, detector: str = "pose") -> bool:
+    """
+    Convert all videos in a folder to vertical format.
+    
+    Args:
+        input_folder: Path to folder containing input video files
+        output_folder: Path to output folder (default: vertical_output)
+        width: Output width (default: 1080)
+        height: Output height (default: 1920)
+        extensions: List of video file extensions to process
+        encoder: FFmpeg video encoder (default: best available, e.g. h264_nvenc)
+        pose_complexity: MediaPipe Pose model complexity used to find the person, 0-2 (default: 0)
+        pose_stride: Run person detection on every n-th frame (default: 3)
+        workers: Number of videos to convert at the same time, each in its own process (default: 1)
+        detector: Person detector to use, "pose" or the faster "face" (default: pose)
+        
+    Returns:
+        bool: True if at least one video was processed successfully, False otherwise
+    """
+    # Set default extensions if None
+    if extensions is None:
+        extensions = [".mp4", ".avi", ".mov", ".mkv", ".webm"]
     
     # Validate input folder
-    if not os.path.isdir(args.input_folder):
-        print(f"Error: Input folder '{args.input_folder}' does not exist or is not a directory.")
-        return
+    if not os.path.isdir(input_folder):
+        print(f"Error: Input folder '{input_folder}' does not exist or is not a directory.")
+        return False
     
     # Set up output folder
-    if args.output_folder is None:
+    if output_folder is None:
         # Set default output directory to 'vertical_output' folder in the same directory as the script
         script_dir = os.path.dirname(os.path.abspath(__file__))
         output_folder = os.path.join(script_dir, "vertical_output")
-    else:
-        output_folder = args.output_folder
     
     # Create output directory if it doesn't exist
     if not os.path.exists(output_folder):
@@ -303,28 +511,26 @@ def main():
     
     # Find all video files in the input folder
     video_files = set()  # Changed from list to set to ensure uniqueness
-    for ext in args.extensions:
-        pattern = os.path.join(args.input_folder, f"*{ext}")
+    for ext in extensions:
+        pattern = os.path.join(input_folder, f"*{ext}")
         video_files.update(glob.glob(pattern))
         # Also search for uppercase extensions
-        pattern = os.path.join(args.input_folder, f"*{ext.upper()}")
+        pattern = os.path.join(input_folder, f"*{ext.upper()}")
         video_files.update(glob.glob(pattern))
     
     # Convert set back to sorted list for consistent display
     video_files = sorted(list(video_files))
     
     if not video_files:
-        print(f"No video files found in {args.input_folder} with extensions {args.extensions}")
-        return
+        print(f"No video files found in {input_folder} with extensions {extensions}")
+        return False
     
     print(f"Found {len(video_files)} video files to process:")
     for i, video_file in enumerate(video_files):
         print(f"  {i+1}. {os.path.basename(video_file)}")
     
-    # Process each video file
-    total_start_time = time.time()
-    successful_videos = 0
-    
+    # Collect the videos that still need converting
+    pending_videos = []
     for video_file in video_files:
         input_basename = os.path.basename(video_file)
         input_name, input_ext = os.path.splitext(input_basename)
@@ -338,24 +544,55 @@ def main():
             print(f"\nSkipping {input_basename} - output file already exists")
             continue
         
-        print(f"\nProcessing video {input_basename}")
-        
-        try:
-            # Process video
-            start_time = time.time()
-            clipper = VerticalVideoClipper(video_file, output_path, args.width, args.height)
-            clipper.process()
-            end_time = time.time()
-            
-            print(f"Processing completed in {end_time - start_time:.2f} seconds")
-            successful_videos += 1
-        except Exception as e:
-            print(f"Error processing video {input_basename}: {str(e)}")
+        pending_videos.append((video_file, output_path))
+    
+    # Process each video file
+    total_start_time = time.time()
+    successful_videos = 0
+    conversion_options = (width, height, encoder, pose_complexity, pose_stride, detector)
+    
+    if workers > 1 and len(pending_videos) > 1:
+        # Convert several clips at once in separate processes, each with its own MediaPipe
+        # model and encoder. Pick the encoder once instead of in every worker process.
+        conversion_options = (width, height, encoder or detect_hw_encoder(), pose_complexity, pose_stride, detector)
+        print(f"\nConverting {len(pending_videos)} videos with {workers} worker processes")
+        # Spawn fresh workers rather than forking, the calling process may hold a CUDA context
+        # (the Whisper model in main.py) and helper threads that a fork would copy in a broken state
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_convert_video, video_file, output_path, *conversion_options)
+                for video_file, output_path in pending_videos
+            ]
+            for future in as_completed(futures):
+                if future.result():
+                    successful_videos += 1
+    else:
+        for video_file, output_path in pending_videos:
+            if _convert_video(video_file, output_path, *conversion_options):
+                successful_videos += 1
     
     total_end_time = time.time()
     print(f"\nAll processing completed in {total_end_time - total_start_time:.2f} seconds")
     print(f"Successfully processed {successful_videos} out of {len(video_files)} videos.")
     print(f"Output files are in: {output_folder}")
+    
+    return successful_videos > 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert landscape videos to vertical format with focus on people")
+    parser.add_argument("input_folder", help="Path to folder containing input video files")
+    parser.add_argument("--output_folder", "-o", help="Path to output folder (optional)")
+    parser.add_argument("--width", type=int, default=1080, help="Output width (default: 1080)")
+    parser.add_argument("--height", type=int, default=1920, help="Output height (default: 1920)")
+    parser.add_argument("--extensions", nargs="+", default=[".mp4", ".avi", ".mov", ".mkv", ".webm"], help="Video file extensions to process (default: .mp4 .avi .mov .mkv .webm)")
+    parser.add_argument("--encoder", help="FFmpeg video encoder, e.g. h264_nvenc, h264_qsv, libx264 (default: best available)")
+    parser.add_argument("--pose_complexity", type=int, choices=[0, 1, 2], default=0, help="MediaPipe Pose model complexity: 0 (lite, fastest), 1 (full) or 2 (heavy) (default: 0)")
+    parser.add_argument("--pose_stride", type=int, default=3, help="Detect the person on every n-th frame and reuse the position in between; 1 detects on every frame (default: 3)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of videos to convert in parallel, each in its own process (default: 1)")
+    parser.add_argument("--detector", choices=["pose", "face"], default="pose", help="Follow the center of the body pose or, faster, of the most confident face (default: pose)")
+    args = parser.parse_args()
+    
+    process_folder(args.input_folder, args.output_folder, args.width, args.height, args.extensions, args.encoder, args.pose_complexity, args.pose_stride, args.workers, args.detector)
 
 if __name__ == "__main__":
     main()
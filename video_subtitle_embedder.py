@@ -1,18 +1,110 @@
 import os
 import cv2
+import numpy as np
 import argparse
 import re
 import time
 import tempfile
-import subprocess
+import shutil
 import json
 import math
 import sys
+import queue
+import threading
+import bisect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from utils.file_scanner import scan_files
+from utils.video_writer import FFmpegVideoWriter, detect_hw_encoder, filter_video, has_ass_filter
+
+# ASS script for plain subtitles, in the video's own pixel coordinates: white text with a black
+# outline, centered, wrapped 50 pixels from each side, its bottom edge at ~75% of the frame height
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,{font_size},&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,-1,0,0,0,100,100,0,0,1,{outline},0,2,50,50,{margin_v},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+# Frames between progress lines when the frame progress bar is hidden
+PROGRESS_PRINT_INTERVAL = 500
+
+# One SRT entry: index line, timestamp line and the text lines up to the next blank line.
+# An entry without text doesn't match, so it can't swallow the entry after it.
+SRT_ENTRY_PATTERN = re.compile(
+    r"^[ \t]*(\d+)[ \t]*\n"
+    r"(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})[^\n]*\n"
+    r"([^\n]*\S[^\n]*(?:\n[^\n]*\S[^\n]*)*)",
+    re.MULTILINE
+)
+
+@lru_cache(maxsize=4096)
+def _get_text_size(text: str, font: int, font_scale: float, thickness: int):
+    """
+    Measure text with cv2.getTextSize, memoized since the same words are measured on every frame.
+    
+    Args:
+        text: Text to measure
+        font: OpenCV font
+        font_scale: Font scale factor
+        thickness: Text thickness
+        
+    Returns:
+        ((width, height), baseline) as returned by cv2.getTextSize
+    """
+    return cv2.getTextSize(text, font, font_scale, thickness)
+
+# Text outlines reach 2 pixels past the glyph strokes in every direction
+OUTLINE_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+
+def _draw_outlined_text(image, text: str, origin: tuple, font: int, font_scale: float, color: tuple, thickness: int, outline_thickness: int):
+    """
+    Draw text with a black outline.
+    
+    The outline is the text drawn at outline_thickness and dilated by OUTLINE_KERNEL, which
+    looks the same for any OpenCV font renderer and costs two putText calls.
+    
+    Args:
+        image: Image to draw on
+        text: Text to draw
+        origin: Bottom-left corner of the text
+        font: OpenCV font
+        font_scale: Font scale factor
+        color: Text color
+        thickness: Text thickness
+        outline_thickness: Thickness of the text the outline is grown from
+    """
+    (text_width, text_height), baseline = _get_text_size(text, font, font_scale, outline_thickness)
+    image_height, image_width = image.shape[:2]
+    padding = outline_thickness + OUTLINE_KERNEL.shape[0]
+    left, top = max(origin[0] - padding, 0), max(origin[1] - text_height - padding, 0)
+    right, bottom = min(origin[0] + text_width + padding, image_width), min(origin[1] + baseline + padding, image_height)
+    if right <= left or bottom <= top:
+        return
+    
+    # Only work on the area around the text
+    roi = image[top:bottom, left:right]
+    mask = np.zeros(roi.shape[:2], np.uint8)
+    cv2.putText(mask, text, (origin[0] - left, origin[1] - top), font, font_scale, 255, outline_thickness)
+    roi[cv2.dilate(mask, OUTLINE_KERNEL) > 0] = 0
+    cv2.putText(image, text, origin, font, font_scale, color, thickness, cv2.LINE_AA)
 
 class SubtitleEntry:
     """Class representing a single subtitle entry."""
+    __slots__ = ("index", "start_time", "end_time", "text", "word_timings")
+    
     def __init__(self, index: int, start_time: float, end_time: float, text: str, word_timings: List[Dict] = None):
         self.index = index
         self.start_time = start_time
@@ -25,7 +117,7 @@ class SubtitleEntry:
         return f"SubtitleEntry({self.index}, {self.start_time:.2f}, {self.end_time:.2f}, '{self.text}')"
 
 class SubtitleProcessor:
-    def __init__(self, videos_folder: str, subtitles_folder: str, output_folder: str, highlight_style: str = None, animation_style: str = "bounce"):
+    def __init__(self, videos_folder: str, subtitles_folder: str, output_folder: str, highlight_style: str = None, animation_style: str = "bounce", encoder: str = None, workers: int = 1):
         """
         Initialize the SubtitleProcessor.
         
@@ -35,12 +127,19 @@ class SubtitleProcessor:
             output_folder: Path where the output videos with subtitles will be saved
             highlight_style: Style of word highlighting ('standard', 'bigword', or None)
             animation_style: Animation style for bigword mode ('bounce' or 'scale')
+            encoder: FFmpeg video encoder (default: best available, e.g. h264_nvenc)
+            workers: Number of videos to process at the same time, each in its own process
         """
         self.videos_folder = videos_folder
         self.subtitles_folder = subtitles_folder
         self.output_folder = output_folder
         self.highlight_style = highlight_style
         self.animation_style = animation_style
+        self.encoder = encoder
+        self.workers = workers
+        
+        # List the subtitle folder once instead of checking for each video's files separately
+        self.subtitle_files = set(os.listdir(subtitles_folder)) if os.path.isdir(subtitles_folder) else set()
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_folder):
@@ -49,6 +148,10 @@ class SubtitleProcessor:
         
         # For animations
         self.animation_oscillator = 0
+        
+        # Pre-rendered plain subtitles (overlay, mask, x, y) for each text and frame size,
+        # copied onto every frame while the subtitle stays on screen
+        self.text_sprites: Dict[Tuple[str, int, int], Tuple[np.ndarray, np.ndarray, int, int]] = {}
     
     def process_videos(self, video_extensions: List[str] = None):
         """
@@ -65,11 +168,7 @@ class SubtitleProcessor:
                 video_extensions = [".mp4", ".avi", ".mov", ".mkv", ".webm"]
             
             # Get list of video files
-            video_files = []
-            for root, _, files in os.walk(self.videos_folder):
-                for file in files:
-                    if any(file.lower().endswith(ext) for ext in video_extensions):
-                        video_files.append(os.path.join(root, file))
+            video_files = list(scan_files(self.videos_folder, video_extensions))
             
             if not video_files:
                 print(f"No video files found in {self.videos_folder} with extensions {video_extensions}")
@@ -79,9 +178,20 @@ class SubtitleProcessor:
             
             # Process each video file
             successful_videos = 0
-            for video_path in tqdm(video_files, desc="Processing videos"):
-                if self.add_subtitles_to_video(video_path):
-                    successful_videos += 1
+            if self.workers > 1 and len(video_files) > 1:
+                # Pick the encoder once instead of in every worker process
+                self.encoder = self.encoder or detect_hw_encoder()
+                # Spawn fresh workers rather than forking, the calling process may hold a CUDA context
+                # (the Whisper model in main.py) that a fork would copy in a broken state
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    futures = [executor.submit(self.add_subtitles_to_video, video_path) for video_path in video_files]
+                    for future in tqdm(as_completed(futures), total=len(futures), desc="Processing videos"):
+                        if future.result():
+                            successful_videos += 1
+            else:
+                for video_path in tqdm(video_files, desc="Processing videos"):
+                    if self.add_subtitles_to_video(video_path):
+                        successful_videos += 1
             
             print(f"Video processing completed. Successfully processed {successful_videos}/{len(video_files)} videos.")
             return successful_videos > 0
@@ -107,7 +217,7 @@ class SubtitleProcessor:
             subtitle_path = os.path.join(self.subtitles_folder, f"{base_name}.srt")
             
             # Check if subtitle file exists
-            if not os.path.exists(subtitle_path):
+            if f"{base_name}.srt" not in self.subtitle_files:
                 print(f"Subtitle not found for {video_name}, skipping.")
                 return False
             
@@ -119,11 +229,14 @@ class SubtitleProcessor:
             
             # Check if there's a json file with word timings available
             word_timing_path = os.path.join(self.subtitles_folder, f"{base_name}_words.json")
-            if self.highlight_style and os.path.exists(word_timing_path):
+            if self.highlight_style and f"{base_name}_words.json" in self.subtitle_files:
                 self._add_word_timings_to_subtitles(subtitles, word_timing_path)
             
-            # Process video with subtitles
-            self._process_video_with_subtitles(video_path, subtitles)
+            # Plain subtitles are burned in by FFmpeg in one pass, highlighting needs per-frame drawing
+            if not self.highlight_style and has_ass_filter():
+                self._burn_in_subtitles(video_path, subtitles)
+            else:
+                self._process_video_with_subtitles(video_path, subtitles)
             print(f"Successfully processed video: {video_name}")
             return True
             
@@ -170,17 +283,130 @@ class SubtitleProcessor:
         except Exception as e:
             print(f"Error loading word timings from {word_timing_path}: {str(e)}")
     
-    def _process_video_with_subtitles(self, video_path: str, subtitles: List[SubtitleEntry]):
+    def _write_ass_file(self, subtitles: List[SubtitleEntry], width: int, height: int, ass_path: str):
         """
-        Add subtitles to video and save the new video.
+        Write subtitles as an ASS script laid out for a video of the given size.
+        
+        Args:
+            subtitles: List of subtitle entries
+            width: Width of the video
+            height: Height of the video
+            ass_path: Path of the ASS file to write
+        """
+        def ass_time(seconds: float) -> str:
+            centiseconds = int(round(max(seconds, 0) * 100))
+            hours, centiseconds = divmod(centiseconds, 360000)
+            minutes, centiseconds = divmod(centiseconds, 6000)
+            secs, centiseconds = divmod(centiseconds, 100)
+            return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
+        
+        # Sizes follow the OpenCV layout, which scales the text with the video width
+        font_scale = width / 640
+        lines = [ASS_HEADER.format(
+            width=width,
+            height=height,
+            font_size=int(32 * font_scale),
+            outline=max(2, int(font_scale * 2)),
+            margin_v=int(height * 0.25)
+        )]
+        for subtitle in subtitles:
+            # Braces start override tags and backslashes escape codes such as \N, and ASS has no way
+            # to escape either, so swap in look-alikes; then turn the SRT line breaks into ASS ones
+            text = subtitle.text.replace("{", "(").replace("}", ")").replace("\\", "\uff3c")
+            text = text.replace("\r\n", "\n").replace("\n", "\\N")
+            lines.append(f"Dialogue: 0,{ass_time(subtitle.start_time)},{ass_time(subtitle.end_time)},Default,,0,0,0,,{text}\n")
+        
+        with open(ass_path, 'w', encoding='utf-8') as f:
+            f.write("".join(lines))
+    
+    def _burn_in_subtitles(self, video_path: str, subtitles: List[SubtitleEntry]):
+        """
+        Burn plain subtitles into a video with FFmpeg's libass filter, without decoding frames in Python.
         
         Args:
             video_path: Path to input video
             subtitles: List of subtitle entries
         """
-        # Create temporary file for video without audio
-        temp_video_file = os.path.join(tempfile.gettempdir(), f"temp_subtitle_video_{int(time.time())}.mp4")
+        video_name = os.path.basename(video_path)
+        output_path = os.path.join(self.output_folder, video_name)
         
+        # Check if output file already exists
+        if os.path.exists(output_path):
+            print(f"Output file already exists: {output_path}\n")
+            return
+        
+        # Get the video size to lay the subtitles out in pixels
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Write the script into FFmpeg's working directory so the filter graph
+            # never has to escape characters like ':' or quotes in a real path
+            self._write_ass_file(subtitles, width, height, os.path.join(temp_dir, "subtitles.ass"))
+            # Always encode into MP4 like the frame-by-frame path does; H.264/AAC can't be
+            # muxed into every input container (WebM, for one)
+            temp_video_file = os.path.join(temp_dir, "video.mp4")
+            
+            filter_video(video_path, temp_video_file, "ass=subtitles.ass", self.encoder, cwd=temp_dir)
+            
+            # Move the finished video into place; the output only appears once it is complete
+            shutil.move(temp_video_file, output_path)
+    
+    def _read_frames(self, cap, read_queue: queue.Queue, stop_event: threading.Event, frame_buffers: List[np.ndarray]):
+        """
+        Decode frames from an opened video into a queue, followed by None at the end.
+        
+        Args:
+            cap: Opened cv2.VideoCapture
+            read_queue: Bounded queue receiving the decoded frames
+            stop_event: Set by the drawing thread to stop decoding early
+            frame_buffers: Ring of preallocated frames to decode into, in turn
+        """
+        try:
+            buffer_index = 0
+            while not stop_event.is_set():
+                ret, frame = cap.read(frame_buffers[buffer_index])
+                if not ret:
+                    break
+                read_queue.put(frame)
+                buffer_index = (buffer_index + 1) % len(frame_buffers)
+        finally:
+            read_queue.put(None)
+    
+    def _write_frames(self, out: FFmpegVideoWriter, write_queue: queue.Queue):
+        """
+        Encode frames from a queue until None is received.
+        
+        A write error is kept in self.write_error and the remaining frames are
+        discarded, so the drawing thread never blocks on a full queue.
+        
+        Args:
+            out: Video writer to encode the frames with
+            write_queue: Bounded queue with the subtitled frames to write
+        """
+        while True:
+            frame = write_queue.get()
+            if frame is None:
+                break
+            if self.write_error is None:
+                try:
+                    out.write(frame)
+                except Exception as e:
+                    self.write_error = e
+    
+    def _process_video_with_subtitles(self, video_path: str, subtitles: List[SubtitleEntry], prefetch: int = 8):
+        """
+        Add subtitles to video and save the new video.
+        
+        Args:
+            video_path: Path to input video
+            subtitles: List of subtitle entries
+            prefetch: Maximum number of frames buffered between the stages (default: 8)
+        """
         # Open video file
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -202,9 +428,49 @@ class SubtitleProcessor:
             print(f"Output file already exists: {output_path}\n")
             return
         
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_video_file, fourcc, fps, (width, height))
+        # Create a uniquely named temporary file to encode into, several videos may be processed at once
+        temp_fd, temp_video_file = tempfile.mkstemp(prefix="temp_subtitle_video_", suffix=".mp4")
+        os.close(temp_fd)
+        
+        # Sprites are keyed by text and frame size, so keep only the current video's to bound the memory use
+        self.text_sprites.clear()
+        
+        try:
+            # Encode the frames and mux in the original audio in the same FFmpeg process
+            out = FFmpegVideoWriter(temp_video_file, fps, (width, height), self.encoder, audio_file=video_path)
+            self._draw_subtitles(cap, out, subtitles, fps, width, height, total_frames, prefetch, video_name)
+        except Exception:
+            # Don't leave a partial or failed encode behind
+            cap.release()
+            os.remove(temp_video_file)
+            raise
+        
+        # Move the finished video into place; the output only appears once it is complete
+        shutil.move(temp_video_file, output_path)
+            
+        print(f"Video with subtitles saved to: {output_path}")
+    
+    def _draw_subtitles(self, cap, out: FFmpegVideoWriter, subtitles: List[SubtitleEntry], fps: float, width: int, height: int, total_frames: int, prefetch: int, video_name: str):
+        """
+        Draw the subtitles onto every frame of a video and encode the frames.
+        
+        Decoding and encoding run on their own threads, connected to the subtitle
+        drawing in this thread by bounded queues, so they overlap with the drawing.
         
+        Args:
+            cap: Opened cv2.VideoCapture of the input video, released when done
+            out: Video writer to encode the frames with, released when done
+            subtitles: List of subtitle entries
+            fps: Frames per second of the video
+            width: Width of the video
+            height: Height of the video
+            total_frames: Number of frames in the video, for the progress bar
+            prefetch: Maximum number of frames buffered between the stages
+            video_name: File name of the video, to tag the progress lines with
+            
+        Raises:
+            subprocess.CalledProcessError: If FFmpeg failed to encode the video
+        """
         frame_count = 0
         current_time = 0
         
@@ -218,103 +484,98 @@ class SubtitleProcessor:
         bounce_cycle = int(fps * 0.6)  # 0.6 seconds for bounce
         scale_cycle = int(fps * 1.2)   # 1.2 seconds for scale (slower)
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Calculate current time in seconds
-            current_time = frame_count / fps
-            
-            # Update animation oscillator based on the animation style
-            if self.animation_style == "bounce":
-                self.animation_oscillator = (self.animation_oscillator + 1) % bounce_cycle
-            else:  # scale
-                self.animation_oscillator = (self.animation_oscillator + 1) % scale_cycle
-            
-            # Find active subtitles for current time
-            active_subtitle = self._get_active_subtitle(subtitles, current_time)
-            
-            # Add subtitle text to frame if there's an active subtitle
-            if active_subtitle:
-                if self.highlight_style == 'standard' and active_subtitle.word_timings:
-                    frame = self._add_highlighted_text_to_frame(frame, active_subtitle, current_time, font_scale)
-                elif self.highlight_style == 'bigword' and active_subtitle.word_timings:
-                    frame = self._add_big_word_to_frame(frame, active_subtitle, current_time, font_scale, fps)
-                else:
-                    frame = self._add_text_to_frame(frame, active_subtitle.text, font_scale)
-            
-            # Write the frame to output video
-            out.write(frame)
-            
-            frame_count += 1
-            if frame_count % 500 == 0:
-                print(f"Processed {frame_count}/{total_frames} frames ({(frame_count/total_frames)*100:.1f}%)")
+        # Sort the subtitles by start time once so the active one can be found with a binary search
+        subtitles = sorted(subtitles, key=lambda subtitle: subtitle.start_time)
+        start_times = [subtitle.start_time for subtitle in subtitles]
+        
+        read_queue = queue.Queue(maxsize=prefetch)
+        write_queue = queue.Queue(maxsize=prefetch)
+        stop_event = threading.Event()
+        self.write_error = None
+        # Decode into a ring of reused frames instead of a new array per frame. Subtitles are drawn
+        # in place, so a frame can wait in either queue or be in each of the three threads at once
+        # and a buffer is only reused after the frame it held has been written.
+        frame_buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2 * prefetch + 3)]
+        reader = threading.Thread(target=self._read_frames, args=(cap, read_queue, stop_event, frame_buffers), daemon=True)
+        writer = threading.Thread(target=self._write_frames, args=(out, write_queue), daemon=True)
+        reader.start()
+        writer.start()
+        
+        # Show frame progress only for a single video on a terminal; worker processes
+        # would write over each other and the per-video bar already tracks them.
+        # Otherwise print a progress line every PROGRESS_PRINT_INTERVAL frames instead.
+        progress = tqdm(total=total_frames, unit="frame", leave=False, disable=self.workers > 1 or not sys.stderr.isatty())
         
-        # Release OpenCV resources
-        cap.release()
-        out.release()
-        
-        # Add audio from the original file to the output
-        self._add_audio_to_video(video_path, temp_video_file, output_path)
-        
-        # Remove the temporary file
-        if os.path.exists(temp_video_file):
-            os.remove(temp_video_file)
-            
-        print(f"Video with subtitles saved to: {output_path}")
-    
-    def _add_audio_to_video(self, input_video: str, subtitle_video: str, output_video: str):
-        """
-        Extract audio from input video and add it to the subtitle video.
-        
-        Args:
-            input_video: Original video with audio
-            subtitle_video: Video with subtitles but no audio
-            output_video: Final output file path
-        """
         try:
-            # Use FFmpeg to combine the video with the original audio
-            cmd = [
-                'ffmpeg',
-                '-i', subtitle_video,     # Video with subtitles
-                '-i', input_video,        # Original file with audio
-                '-c:v', 'copy',           # Copy video stream without re-encoding
-                '-c:a', 'aac',            # Audio codec
-                '-map', '0:v:0',          # Use video from first input
-                '-map', '1:a:0',          # Use audio from second input
-                '-shortest',              # Finish encoding when the shortest input stream ends
-                output_video              # Output file
-            ]
-            
-            print("Adding audio to the video...")
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+            while True:
+                frame = read_queue.get()
+                if frame is None:
+                    break
                 
-        except subprocess.CalledProcessError as e:
-            print(f"Error adding audio: {e}")
-            print("Saving video without audio...")
-            if os.path.exists(subtitle_video):
-                os.rename(subtitle_video, output_video)
-        except FileNotFoundError:
-            print("FFmpeg not found. Please install FFmpeg to add audio to the video.")
-            print("Saving video without audio...")
-            if os.path.exists(subtitle_video):
-                os.rename(subtitle_video, output_video)
+                # Calculate current time in seconds
+                current_time = frame_count / fps
+                
+                # Update animation oscillator based on the animation style
+                if self.animation_style == "bounce":
+                    self.animation_oscillator = (self.animation_oscillator + 1) % bounce_cycle
+                else:  # scale
+                    self.animation_oscillator = (self.animation_oscillator + 1) % scale_cycle
+                
+                # Find active subtitles for current time
+                active_subtitle = self._get_active_subtitle(subtitles, start_times, current_time)
+                
+                # Add subtitle text to frame if there's an active subtitle
+                if active_subtitle:
+                    if self.highlight_style == 'standard' and active_subtitle.word_timings:
+                        frame = self._add_highlighted_text_to_frame(frame, active_subtitle, current_time, font_scale)
+                    elif self.highlight_style == 'bigword' and active_subtitle.word_timings:
+                        frame = self._add_big_word_to_frame(frame, active_subtitle, current_time, font_scale, fps)
+                    else:
+                        frame = self._add_text_to_frame(frame, active_subtitle.text, font_scale)
+                
+                # Hand the frame to the writer thread
+                write_queue.put(frame)
+                
+                frame_count += 1
+                progress.update(1)
+                if progress.disable and frame_count % PROGRESS_PRINT_INTERVAL == 0:
+                    print(f"{video_name}: frame {frame_count}/{total_frames}", flush=True)
+        finally:
+            progress.close()
+            
+            # Stop the reader and unblock it if it is waiting on a full queue
+            stop_event.set()
+            while reader.is_alive():
+                try:
+                    read_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            write_queue.put(None)
+            writer.join()
+            
+            # Release decoder and encoder resources; the encoder raises if FFmpeg failed
+            cap.release()
+            out.release()
+        
+        if self.write_error is not None:
+            raise self.write_error
     
-    def _get_active_subtitle(self, subtitles: List[SubtitleEntry], current_time: float) -> Optional[SubtitleEntry]:
+    def _get_active_subtitle(self, subtitles: List[SubtitleEntry], start_times: List[float], current_time: float) -> Optional[SubtitleEntry]:
         """
         Get the subtitle entry active at the current time.
         
         Args:
-            subtitles: List of subtitle entries
+            subtitles: List of subtitle entries, sorted by start time
+            start_times: Start time of each subtitle entry, in the same order
             current_time: Current time in the video (seconds)
             
         Returns:
             Active subtitle entry or None if no active subtitle
         """
-        for subtitle in subtitles:
-            if subtitle.start_time <= current_time <= subtitle.end_time:
-                return subtitle
+        # The last subtitle starting at or before the current time is the only candidate
+        index = bisect.bisect_right(start_times, current_time) - 1
+        if index >= 0 and current_time <= subtitles[index].end_time:
+            return subtitles[index]
         
         return None
     
@@ -368,7 +629,7 @@ class SubtitleProcessor:
             y_offset = int(bounce_position)
             
             # Get text dimensions
-            (text_width, text_height), _ = cv2.getTextSize(current_word, font, final_font_scale, thickness)
+            (text_width, text_height), _ = _get_text_size(current_word, font, final_font_scale, thickness)
             
             # Position the word at 70% of the screen height with bounce effect
             x_position = (width - text_width) // 2
@@ -407,7 +668,7 @@ class SubtitleProcessor:
             y_offset = 0  # No vertical movement in scale mode
             
             # Get text dimensions for current scale
-            (text_width, text_height), _ = cv2.getTextSize(current_word, font, final_font_scale, thickness)
+            (text_width, text_height), _ = _get_text_size(current_word, font, final_font_scale, thickness)
             
             # Position the word at 70% of the screen height
             x_position = (width - text_width) // 2
@@ -415,33 +676,10 @@ class SubtitleProcessor:
             
             # Draw text with black outline (no background)
             text_color = (230, 230, 100)  # Light yellow
-            outline_color = (0, 0, 0)  # Black outline
             
-            # Draw the outline (thicker for better visibility)
+            # Draw the text with its outline (thicker for better visibility)
             outline_thickness = thickness + 2
-            for offset_x in [-2, -1, 0, 1, 2]:
-                for offset_y in [-2, -1, 0, 1, 2]:
-                    if offset_x != 0 or offset_y != 0:
-                        cv2.putText(
-                            frame, 
-                            current_word, 
-                            (x_position + offset_x, y_position + offset_y), 
-                            font, 
-                            final_font_scale, 
-                            outline_color, 
-                            outline_thickness
-                        )
-            
-            # Draw the text
-            cv2.putText(
-                frame, 
-                current_word, 
-                (x_position, y_position), 
-                font, 
-                final_font_scale, 
-                text_color, 
-                thickness
-            )
+            _draw_outlined_text(frame, current_word, (x_position, y_position), font, final_font_scale, text_color, thickness, outline_thickness)
         
         return frame
     
@@ -493,7 +731,7 @@ class SubtitleProcessor:
         word_widths = []
         
         for word in words:
-            (text_width, _), _ = cv2.getTextSize(word, font, font_scale, thickness)
+            (text_width, _), _ = _get_text_size(word, font, font_scale, thickness)
             word_widths.append(text_width)
             total_text_width += text_width
             # Add space width
@@ -559,16 +797,8 @@ class SubtitleProcessor:
                 is_highlighted = word.strip('.,?!:;') == highlighted_word.strip('.,?!:;')
                 word_color = highlight_color if is_highlighted else regular_color
                 
-                # Draw black outline/background
-                for offset_x in [-2, -1, 0, 1, 2]:
-                    for offset_y in [-2, -1, 0, 1, 2]:
-                        if offset_x != 0 or offset_y != 0:
-                            cv2.putText(frame, word, 
-                                       (current_x + offset_x, line_y + offset_y), 
-                                       font, font_scale, (0, 0, 0), thickness + 1)
-                
-                # Draw text with appropriate color
-                cv2.putText(frame, word, (current_x, line_y), font, font_scale, word_color, thickness)
+                # Draw text with appropriate color and a black outline/background
+                _draw_outlined_text(frame, word, (current_x, line_y), font, font_scale, word_color, thickness, thickness + 1)
                 
                 # Move x position for next word
                 space_width = int(word_width * 0.3)
@@ -591,9 +821,37 @@ class SubtitleProcessor:
         # Get frame dimensions
         height, width, _ = frame.shape
         
+        # Render the subtitle once and copy the drawn pixels onto every following frame
+        sprite_key = (text, width, height)
+        if sprite_key not in self.text_sprites:
+            self.text_sprites[sprite_key] = self._render_text_sprite(text, width, height, font_scale)
+        overlay, mask, x, y = self.text_sprites[sprite_key]
+        
+        # The sprite is empty if the text falls entirely outside the frame
+        if mask.size:
+            sprite_height, sprite_width = mask.shape
+            cv2.copyTo(overlay, mask, frame[y:y + sprite_height, x:x + sprite_width])
+        
+        return frame
+    
+    def _render_text_sprite(self, text: str, width: int, height: int, font_scale: float):
+        """
+        Draw subtitle text into a small image covering only the text's bounding box.
+        
+        Args:
+            text: Subtitle text to render
+            width: Width of the video frame
+            height: Height of the video frame
+            font_scale: Font scale factor based on video width
+            
+        Returns:
+            (overlay, mask, x, y): BGR image of the text, mask of its drawn pixels and the
+            position of its top-left corner in the frame
+        """
         # Set text properties
         font = cv2.FONT_HERSHEY_DUPLEX
         thickness = max(1, int(font_scale * 2))  # Scale thickness with font size
+        outline_thickness = thickness + 1
         color = (255, 255, 255)  # White text
         
         # Wrap text to fit width and limit to max 3 lines
@@ -607,25 +865,39 @@ class SubtitleProcessor:
         # Position text at approximately 70% of frame height
         y_position = int(height * 0.7) - (total_text_height // 2)
         
-        # Add black outline/background for better readability
+        # Calculate text position for centered text, and the box around all lines and their outline
+        layout = []
+        padding = outline_thickness + OUTLINE_KERNEL.shape[0]
+        left, top, right, bottom = width, height, 0, 0
         for i, line in enumerate(text_lines):
-            # Calculate text position for centered text
-            text_size = cv2.getTextSize(line, font, font_scale, thickness)[0]
-            x_position = (width - text_size[0]) // 2
+            text_width = _get_text_size(line, font, font_scale, thickness)[0][0]
+            (_, text_height), baseline = _get_text_size(line, font, font_scale, outline_thickness)
+            x_position = (width - text_width) // 2
             line_y_position = y_position + (i * line_height) + 30
-            
-            # Draw black outline/background (thicker for better visibility)
-            for offset_x in [-2, -1, 0, 1, 2]:
-                for offset_y in [-2, -1, 0, 1, 2]:
-                    if offset_x != 0 or offset_y != 0:  # Skip the center point
-                        cv2.putText(frame, line, 
-                                   (x_position + offset_x, line_y_position + offset_y), 
-                                   font, font_scale, (0, 0, 0), thickness + 1)
-            
-            # Draw white text
-            cv2.putText(frame, line, (x_position, line_y_position), font, font_scale, color, thickness)
-        
-        return frame
+            layout.append((line, x_position, line_y_position))
+            left = min(left, x_position - padding)
+            top = min(top, line_y_position - text_height - padding)
+            right = max(right, x_position + text_width + padding)
+            bottom = max(bottom, line_y_position + baseline + padding)
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = max(min(right, width), left), max(min(bottom, height), top)
+        
+        overlay = np.zeros((bottom - top, right - left, 3), np.uint8)
+        mask = np.zeros((bottom - top, right - left), np.uint8)
+        if not mask.size:
+            return overlay, mask, left, top
+        
+        # Draw black outline/background (thicker for better visibility): the overlay is black
+        # everywhere, so the mask alone decides which pixels of the frame the outline covers
+        for line, x_position, line_y_position in layout:
+            cv2.putText(mask, line, (x_position - left, line_y_position - top), font, font_scale, 255, outline_thickness)
+        mask = cv2.dilate(mask, OUTLINE_KERNEL)
+        
+        # Draw white text
+        for line, x_position, line_y_position in layout:
+            cv2.putText(overlay, line, (x_position - left, line_y_position - top), font, font_scale, color, thickness, cv2.LINE_AA)
+        
+        return overlay, mask, left, top
     
     def _wrap_text(self, text: str, font, font_scale: float, thickness: int, max_width: int, max_lines: int = 3) -> str:
         """
@@ -652,7 +924,7 @@ class SubtitleProcessor:
             test_text = ' '.join(test_line)
             
             # Check if the line fits
-            text_size = cv2.getTextSize(test_text, font, font_scale, thickness)[0]
+            text_size = _get_text_size(test_text, font, font_scale, thickness)[0]
             
             if text_size[0] <= max_width:
                 # Word fits, add it to the line
@@ -698,39 +970,17 @@ class SubtitleProcessor:
             with open(srt_file, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Split content by double newline to get entries
-            entries = re.split(r'\n\s*\n', content.strip())
-            
-            for entry in entries:
-                lines = entry.strip().split('\n')
-                
-                if len(lines) < 3:
-                    continue  # Invalid entry
-                
-                # Parse entry index
-                try:
-                    index = int(lines[0])
-                except ValueError:
-                    continue  # Invalid index
-                
-                # Parse timestamps
-                timestamp_match = re.match(r'(\d{2}):(\d{2}):(\d{2}),(\d{3}) --> (\d{2}):(\d{2}):(\d{2}),(\d{3})', lines[1])
-                if not timestamp_match:
-                    continue  # Invalid timestamp
+            # Match every entry in a single pass over the file
+            for match in SRT_ENTRY_PATTERN.finditer(content.strip()):
+                index = int(match.group(1))
+                start_h, start_m, start_s, start_ms, end_h, end_m, end_s, end_ms = map(int, match.groups()[1:9])
                 
                 # Convert timestamps to seconds
-                start_time = (int(timestamp_match.group(1)) * 3600 +  # hours
-                             int(timestamp_match.group(2)) * 60 +     # minutes
-                             int(timestamp_match.group(3)) +          # seconds
-                             int(timestamp_match.group(4)) / 1000)    # milliseconds
-                
-                end_time = (int(timestamp_match.group(5)) * 3600 +    # hours
-                           int(timestamp_match.group(6)) * 60 +       # minutes
-                           int(timestamp_match.group(7)) +            # seconds
-                           int(timestamp_match.group(8)) / 1000)      # milliseconds
+                start_time = start_h * 3600 + start_m * 60 + start_s + start_ms / 1000
+                end_time = end_h * 3600 + end_m * 60 + end_s + end_ms / 1000
                 
                 # Get subtitle text (can be multiple lines)
-                text = ' '.join(lines[2:])
+                text = ' '.join(match.group(10).split('\n'))
                 
                 # Create and add entry
                 subtitles.append(SubtitleEntry(index, start_time, end_time, text))
@@ -741,7 +991,7 @@ class SubtitleProcessor:
             print(f"Error parsing subtitle file {srt_file}: {str(e)}")
             return []
 
-def process_videos(videos_folder: str, subtitles_folder: str, output_folder: str = None, highlight_style: str = None, animation_style: str = "bounce", video_extensions: List[str] = None):
+def process_videos(videos_folder: str, subtitles_folder: str, output_folder: str = None, highlight_style: str = None, animation_style: str = "bounce", video_extensions: List[str] = None, encoder: str = None, workers: int = 1):
     """
     Process videos by adding subtitles.
     
@@ -752,6 +1002,8 @@ def process_videos(videos_folder: str, subtitles_folder: str, output_folder: str
         highlight_style: Style of word highlighting ('standard', 'bigword', or None)
         animation_style: Animation style for bigword mode ('bounce' or 'scale')
         video_extensions: List of video file extensions to process
+        encoder: FFmpeg video encoder (default: best available, e.g. h264_nvenc)
+        workers: Number of videos to process at the same time, each in its own process (default: 1)
         
     Returns:
         bool: True if at least one video was processed successfully, False otherwise
@@ -768,7 +1020,9 @@ def process_videos(videos_folder: str, subtitles_folder: str, output_folder: str
             subtitles_folder=subtitles_folder,
             output_folder=output_folder,
             highlight_style=highlight_style,
-            animation_style=animation_style
+            animation_style=animation_style,
+            encoder=encoder,
+            workers=workers
         )
         
         # Set default extensions if None
@@ -790,6 +1044,8 @@ def main():
     parser.add_argument("--highlight", choices=["standard", "bigword"], help="Highlighting style: 'standard' for highlighting within text, 'bigword' for showing only the current word in large text")
     parser.add_argument("--animation", choices=["bounce", "scale"], default="scale", help="Animation style for bigword mode: 'bounce' for bouncing animation, 'scale' for scaling animation (default: scale)")
     parser.add_argument("--extensions", nargs="+", default=[".mp4", ".avi", ".mov", ".mkv", ".webm"], help="Video file extensions to process (default: .mp4 .avi .mov .mkv .webm)")
+    parser.add_argument("--encoder", help="FFmpeg video encoder, e.g. h264_nvenc, h264_qsv, libx264 (default: best available)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of videos to process at the same time, each in its own process (default: 1)")
     args = parser.parse_args()
     
     # Process videos
@@ -799,7 +1055,9 @@ def main():
         output_folder=args.output_folder,
         highlight_style=args.highlight,
         animation_style=args.animation,
-        video_extensions=args.extensions
+        video_extensions=args.extensions,
+        encoder=args.encoder,
+        workers=args.workers
     )
     
     if not success:
@@ -1,26 +1,126 @@
 import os
 import argparse
-import whisper
 import time
 import json
 import sys
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+import ctranslate2
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from huggingface_hub.utils import LocalEntryNotFoundError
+
+from utils.file_scanner import scan_files
 
 class SubtitleGenerator:
-    def __init__(self, model_name="base", max_words_per_subtitle=12):
+    def __init__(self, model_name="base", max_words_per_subtitle=12, batch_size=16, compute_type=None, vad_filter=True, num_gpus=1):
         """
         Initialize the SubtitleGenerator with the specified Whisper model.
+        The model itself is loaded on the first transcription, so runs where every
+        video already has subtitles never pay the model load cost.
         
         Args:
-            model_name: Whisper model size to use (tiny, base, small, medium, large)
+            model_name: Whisper model size to use (tiny, base, small, medium, large) or path to a CTranslate2 model directory
             max_words_per_subtitle: Maximum number of words per subtitle segment
+            batch_size: Number of audio chunks decoded together by the batched pipeline
+            compute_type: CTranslate2 weight/compute precision, e.g. float16, int8_float16, int8 (default: float16 on GPU, int8 on CPU)
+            vad_filter: Whether to drop non-speech audio with Silero VAD before it reaches the encoder
+            num_gpus: Number of GPUs to load the model on, 0 for every visible GPU; transcriptions
+                called from several threads then run in parallel, one per GPU (default: 1)
         """
-        print(f"Loading Whisper model '{model_name}'...")
-        self.model = whisper.load_model(model_name)
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.model = None
+        self.batch_size = batch_size
         self.max_words_per_subtitle = max_words_per_subtitle
+        self.vad_filter = vad_filter
+        self.num_gpus = num_gpus
+        self.num_workers = 1
+    
+    def load_model(self):
+        """
+        Load the Whisper model if it hasn't been loaded yet.
+        
+        Returns:
+            WhisperModel: The loaded Whisper model
+        """
+        if self.model is not None:
+            return self.model
+        
+        # Use the GPU with float16 weights when available, otherwise int8 on CPU
+        gpu_count = ctranslate2.get_cuda_device_count()
+        if gpu_count > 0:
+            device = "cuda"
+            preferred_compute_types = ["float16", "int8_float16", "int8", "float32"]
+            # One model replica per GPU, each serving one transcription at a time
+            num_gpus = gpu_count if self.num_gpus <= 0 else min(self.num_gpus, gpu_count)
+            device_index = list(range(num_gpus))
+        else:
+            device = "cpu"
+            preferred_compute_types = ["int8", "float32"]
+            device_index = [0]
+        self.num_workers = len(device_index)
+        
+        # Only pick a precision every selected device supports (older GPUs lack float16 and int8_float16)
+        supported_compute_types = set.intersection(
+            *(set(ctranslate2.get_supported_compute_types(device, index)) for index in device_index)
+        )
+        if self.compute_type:
+            preferred_compute_types.insert(0, self.compute_type)
+        compute_type = next(
+            (compute_type for compute_type in preferred_compute_types if compute_type in supported_compute_types),
+            "float32"
+        )
+        if self.compute_type and compute_type != self.compute_type:
+            print(f"Compute type '{self.compute_type}' is not supported on {device}, using '{compute_type}' instead.")
+        
+        print(f"Loading Whisper model '{self.model_name}' on {device} {device_index} ({compute_type})...")
+        self.model = self._create_whisper_model(device, device_index, compute_type)
+        
         print("Model loaded successfully.")
+        return self.model
+    
+    def _create_whisper_model(self, device, device_index, compute_type):
+        """
+        Create the faster-whisper model, preferring the local model cache.
+        
+        Args:
+            device: Device to run the model on ("cuda" or "cpu")
+            device_index: List of device IDs to load a model replica on
+            compute_type: CTranslate2 compute type
+            
+        Returns:
+            WhisperModel: The loaded model
+        """
+        model_options = {
+            "device": device,
+            "device_index": device_index,
+            "compute_type": compute_type,
+            # num_workers counts replicas per device; the device_index list already gives one per GPU
+            "num_workers": 1,
+            # CTranslate2 only uses 4 threads per worker by default; use every core on CPU
+            "cpu_threads": os.cpu_count() if device == "cpu" else 0
+        }
+        try:
+            # Reuse the cached model files without checking the Hugging Face Hub for updates
+            return WhisperModel(self.model_name, local_files_only=True, **model_options)
+        except LocalEntryNotFoundError:
+            print(f"Model '{self.model_name}' is not cached yet, downloading...")
+            return WhisperModel(self.model_name, **model_options)
     
-    def generate_subtitle(self, video_path, output_path, generate_word_timings=False):
+    def load_audio(self, video_path):
+        """
+        Decode the audio track of a video into a 16 kHz mono float32 array.
+        
+        Args:
+            video_path: Path to the input video file
+            
+        Returns:
+            numpy.ndarray: Decoded audio samples
+        """
+        return decode_audio(video_path, sampling_rate=16000)
+    
+    def generate_subtitle(self, video_path, output_path, generate_word_timings=False, audio=None):
         """
         Generate subtitles for a video file using Whisper.
         
@@ -28,6 +128,7 @@ class SubtitleGenerator:
             video_path: Path to the input video file
             output_path: Path where the subtitle file will be saved
             generate_word_timings: Whether to generate a JSON file with word timings
+            audio: Already decoded audio from load_audio (optional, decoded from video_path if None)
         
         Returns:
             bool: True if subtitles were generated successfully, False otherwise
@@ -35,24 +136,48 @@ class SubtitleGenerator:
         try:
             print(f"Transcribing video: {os.path.basename(video_path)}")
             
-            # Use standard Whisper transcription without additional parameters
-            # This ensures compatibility with different Whisper versions
-            result = self.model.transcribe(video_path)
+            # Batched transcription; segments are produced lazily by a generator.
+            # With the VAD filter only speech regions are encoded, and the segment
+            # timestamps are mapped back to the original audio timeline.
+            # The pipeline is a thin wrapper with per-call state, so each call gets its own
+            # and concurrent calls from several threads can share the model.
+            pipeline = BatchedInferencePipeline(model=self.load_model())
+            if audio is None:
+                audio = self.load_audio(video_path)
+            # Without VAD the pipeline needs the clips to transcribe spelled out, otherwise it
+            # rejects any audio of 30 seconds or more. Cover the whole audio in 30 second windows,
+            # given in seconds as faster-whisper expects for clip_timestamps.
+            clip_timestamps = None
+            if not self.vad_filter:
+                sampling_rate = 16000
+                window = 30 * sampling_rate
+                clip_timestamps = [
+                    {"start": start / sampling_rate, "end": min(start + window, len(audio)) / sampling_rate}
+                    for start in range(0, len(audio), window)
+                ]
+            segments, _ = pipeline.transcribe(
+                audio,
+                batch_size=self.batch_size,
+                word_timestamps=True,
+                vad_filter=self.vad_filter,
+                clip_timestamps=clip_timestamps
+            )
+            result = self._segments_to_result(segments)
             
             # Post-process and refine segments
             refined_segments = self._refine_segments(result)
             
-            # Create .srt format
+            # Format all start and end times at once (convert seconds to SRT format)
+            start_times = self._format_times([segment["start"] for segment in refined_segments])
+            end_times = self._format_times([segment["end"] for segment in refined_segments])
+            
+            # Build all subtitle entries and write the .srt file in one call
+            entries = [
+                f"{i}\n{start_time} --> {end_time}\n{segment['text'].strip()}\n\n"
+                for i, (segment, start_time, end_time) in enumerate(zip(refined_segments, start_times, end_times), start=1)
+            ]
             with open(output_path, 'w', encoding='utf-8') as srt_file:
-                for i, segment in enumerate(refined_segments, start=1):
-                    # Format start and end times (convert seconds to SRT format)
-                    start_time = self._format_time(segment["start"])
-                    end_time = self._format_time(segment["end"])
-                    
-                    # Write subtitle entry
-                    srt_file.write(f"{i}\n")
-                    srt_file.write(f"{start_time} --> {end_time}\n")
-                    srt_file.write(f"{segment['text'].strip()}\n\n")
+                srt_file.write("".join(entries))
             
             # Generate word-level timing JSON if requested
             if generate_word_timings:
@@ -63,11 +188,33 @@ class SubtitleGenerator:
             
         except Exception as e:
             print(f"Error generating subtitle for {video_path}: {str(e)}")
-            # Check for FFmpeg-related errors
-            if "ffmpeg" in str(e).lower() or "pipe" in str(e).lower():
-                print("This appears to be an FFmpeg error. Make sure FFmpeg is installed correctly and the video file is valid.")
             return False
     
+    def _segments_to_result(self, segments):
+        """
+        Convert faster-whisper segments into the dictionary layout used by the rest of the generator.
+        
+        Args:
+            segments: Iterable of faster-whisper Segment objects
+            
+        Returns:
+            dict: Transcription result with a "segments" list of dictionaries
+        """
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "words": [
+                    # faster-whisper keeps the space before each word (" Hello"), drop it
+                    {"word": word.word.strip(), "start": word.start, "end": word.end}
+                    for word in (segment.words or [])
+                ]
+            })
+        
+        return {"segments": result_segments}
+    
     def _generate_word_timing_json(self, result, srt_path):
         """
         Generate a JSON file with word-level timing information.
@@ -80,46 +227,14 @@ class SubtitleGenerator:
             # Create a path for the JSON file
             json_path = os.path.splitext(srt_path)[0] + "_words.json"
             
-            # Extract word timing information
-            word_data = {"words": []}
+            # Word timings come straight from the transcription (word_timestamps=True),
+            # aligned by Whisper's cross-attention rather than estimated from segment lengths
+            word_data = {"words": [word for segment in result["segments"] for word in segment["words"]]}
             
-            # Try to extract word-level timing from segments
-            for segment in result["segments"]:
-                segment_text = segment["text"].strip()
-                segment_start = segment["start"]
-                segment_end = segment["end"]
-                segment_duration = segment_end - segment_start
-                
-                # Split into words and estimate timing
-                words = segment_text.split()
-                if len(words) == 0:
-                    continue
-                    
-                # If we have word-level timestamps (available in newer Whisper versions)
-                if "words" in segment and segment["words"]:
-                    for word_info in segment["words"]:
-                        if "word" in word_info and "start" in word_info and "end" in word_info:
-                            word_data["words"].append({
-                                "word": word_info["word"],
-                                "start": word_info["start"],
-                                "end": word_info["end"]
-                            })
-                else:
-                    # Estimate word timing based on segment duration
-                    word_duration = segment_duration / len(words)
-                    for i, word in enumerate(words):
-                        word_start = segment_start + (i * word_duration)
-                        word_end = word_start + word_duration
-                        
-                        word_data["words"].append({
-                            "word": word,
-                            "start": word_start,
-                            "end": word_end
-                        })
-            
-            # Save to JSON file
+            # Serialize in memory and save to JSON file in one write, json.dump would
+            # issue a separate write call for every encoded token
             with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(word_data, f, indent=2)
+                f.write(json.dumps(word_data, indent=2))
                 
             print(f"Word timing data saved to: {json_path}")
                 
@@ -150,55 +265,86 @@ class SubtitleGenerator:
                     "text": text
                 })
                 continue
+            
+            # For longer segments with word-level timestamps, split on the real word timings
+            if segment.get("words"):
+                for i in range(0, len(segment["words"]), self.max_words_per_subtitle):
+                    chunk = segment["words"][i:i+self.max_words_per_subtitle]
+                    refined_segments.append({
+                        "start": chunk[0]["start"],
+                        "end": chunk[-1]["end"],
+                        "text": " ".join(word["word"] for word in chunk)
+                    })
+                continue
                 
-            # For longer segments, split into smaller chunks based on word count
-            # Simple approach that works with all Whisper versions
+            # Otherwise split into smaller chunks based on word count and estimated timing
             segment_duration = segment["end"] - segment["start"]
             words_per_second = len(words) / segment_duration if segment_duration > 0 else 1
             
-            for i in range(0, len(words), self.max_words_per_subtitle):
-                chunk = words[i:i+self.max_words_per_subtitle]
-                # Calculate estimated duration for this chunk
-                chunk_duration = len(chunk) / words_per_second if words_per_second > 0 else 2.0
-                
-                # Calculate time positions
-                chunk_start = segment["start"] + (i / words_per_second if words_per_second > 0 else 0)
-                chunk_end = min(chunk_start + chunk_duration, segment["end"])
-                
-                # Add a small gap between segments for readability
-                if i > 0:
-                    chunk_start += 0.1
-                
-                refined_segments.append({
+            # Calculate time positions and estimated durations for all chunks at once
+            chunk_offsets = np.arange(0, len(words), self.max_words_per_subtitle)
+            chunk_lengths = np.minimum(self.max_words_per_subtitle, len(words) - chunk_offsets)
+            chunk_starts = segment["start"] + chunk_offsets / words_per_second
+            chunk_ends = np.minimum(chunk_starts + chunk_lengths / words_per_second, segment["end"])
+            
+            # Add a small gap between segments for readability
+            chunk_starts[1:] += 0.1
+            
+            refined_segments.extend(
+                {
                     "start": chunk_start,
                     "end": chunk_end,
-                    "text": " ".join(chunk).strip()
-                })
+                    "text": " ".join(words[offset:offset+self.max_words_per_subtitle])
+                }
+                for offset, chunk_start, chunk_end in zip(chunk_offsets.tolist(), chunk_starts.tolist(), chunk_ends.tolist())
+            )
         
         return refined_segments
     
-    def _format_time(self, seconds):
+    def _format_times(self, seconds):
         """
-        Convert seconds to SRT time format (HH:MM:SS,mmm).
+        Convert a list of times in seconds to SRT time format (HH:MM:SS,mmm).
         
         Args:
-            seconds: Time in seconds
+            seconds: List of times in seconds
             
         Returns:
-            str: Formatted time string
+            list: Formatted time strings
         """
-        # Handle negative times (shouldn't happen but just in case)
-        seconds = max(0, seconds)
+        # Work on whole milliseconds; handle negative times (shouldn't happen but just in case)
+        milliseconds = (np.maximum(np.asarray(seconds, dtype=np.float64), 0) * 1000).astype(np.int64)
         
-        hours = int(seconds // 3600)
-        seconds %= 3600
-        minutes = int(seconds // 60)
-        seconds %= 60
-        milliseconds = int((seconds - int(seconds)) * 1000)
+        hours, milliseconds = np.divmod(milliseconds, 3_600_000)
+        minutes, milliseconds = np.divmod(milliseconds, 60_000)
+        secs, milliseconds = np.divmod(milliseconds, 1000)
         
-        return f"{hours:02d}:{minutes:02d}:{int(seconds):02d},{milliseconds:03d}"
+        return [
+            f"{h:02d}:{m:02d}:{sec:02d},{ms:03d}"
+            for h, m, sec, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), milliseconds.tolist())
+        ]
 
-def process_folder(input_folder, output_folder=None, generate_word_timings=False, model_name="base", max_words=12, extensions=None):
+def _transcribe_video(subtitle_generator, video_path, subtitle_path, generate_word_timings):
+    """
+    Decode and transcribe a single video, used by the multi-GPU worker threads.
+    
+    Args:
+        subtitle_generator: Loaded SubtitleGenerator shared by all workers
+        video_path: Path to the input video file
+        subtitle_path: Path where the subtitle file will be saved
+        generate_word_timings: Whether to generate a JSON file with word timings
+        
+    Returns:
+        bool: True if subtitles were generated successfully, False otherwise
+    """
+    try:
+        audio = subtitle_generator.load_audio(video_path)
+    except Exception as e:
+        print(f"Error decoding audio for {os.path.basename(video_path)}: {str(e)}")
+        return False
+    
+    return subtitle_generator.generate_subtitle(video_path, subtitle_path, generate_word_timings=generate_word_timings, audio=audio)
+
+def process_folder(input_folder, output_folder=None, generate_word_timings=False, model_name="base", max_words=12, extensions=None, batch_size=16, subtitle_generator=None, compute_type=None, vad_filter=True, num_gpus=1):
     """
     Process all videos in a folder to generate subtitles.
     
@@ -209,6 +355,11 @@ def process_folder(input_folder, output_folder=None, generate_word_timings=False
         model_name: Whisper model to use (default: base)
         max_words: Maximum number of words per subtitle (default: 12)
         extensions: List of video file extensions to process
+        batch_size: Batch size for the batched Whisper pipeline (default: 16)
+        subtitle_generator: SubtitleGenerator to reuse across calls (optional)
+        compute_type: CTranslate2 compute type for the model (default: float16 on GPU, int8 on CPU)
+        vad_filter: Whether to skip non-speech audio with VAD before transcription (default: True)
+        num_gpus: Number of GPUs to transcribe on in parallel, 0 for all of them (default: 1)
         
     Returns:
         bool: True if at least one video was processed successfully, False otherwise
@@ -227,39 +378,72 @@ def process_folder(input_folder, output_folder=None, generate_word_timings=False
         if extensions is None:
             extensions = [".mp4", ".avi", ".mov", ".mkv", ".webm"]
         
-        # Initialize the subtitle generator
-        subtitle_generator = SubtitleGenerator(model_name=model_name, max_words_per_subtitle=max_words)
-        
         # Get list of video files in the input directory
-        video_files = []
-        for root, _, files in os.walk(input_folder):
-            for file in files:
-                if any(file.lower().endswith(ext) for ext in extensions):
-                    video_files.append(os.path.join(root, file))
+        video_files = list(scan_files(input_folder, extensions))
         
         if not video_files:
             print(f"No video files found in {input_folder} with extensions {extensions}")
             return False
         
-        print(f"Found {len(video_files)} video files to process.")
-        
-        # Process each video file
-        successful_videos = 0
-        for video_path in tqdm(video_files, desc="Generating subtitles"):
+        # Skip videos that already have subtitles, using one listing of the output
+        # folder instead of checking for each subtitle file separately
+        existing_files = set(os.listdir(output_folder))
+        pending_videos = []
+        for video_path in video_files:
             # Determine output subtitle path
-            video_name = os.path.basename(video_path)
-            base_name, _ = os.path.splitext(video_name)
-            subtitle_path = os.path.join(output_folder, f"{base_name}.srt")
-            
-            # Check if subtitle already exists
-            if os.path.exists(subtitle_path):
-                print(f"Subtitle already exists for {video_name}, skipping.")
-                successful_videos += 1
-                continue
-            
-            # Generate subtitle
-            if subtitle_generator.generate_subtitle(video_path, subtitle_path, generate_word_timings=generate_word_timings):
-                successful_videos += 1
+            base_name, _ = os.path.splitext(os.path.basename(video_path))
+            subtitle_name = f"{base_name}.srt"
+            if subtitle_name not in existing_files:
+                pending_videos.append((video_path, os.path.join(output_folder, subtitle_name)))
+        
+        successful_videos = len(video_files) - len(pending_videos)
+        print(f"Found {len(video_files)} video files, {successful_videos} already have subtitles, {len(pending_videos)} to transcribe.")
+        
+        if not pending_videos:
+            print("All videos already have subtitles. Nothing to transcribe.")
+            return successful_videos > 0
+        
+        # Initialize the subtitle generator only when there is work to do,
+        # unless one was passed in to be reused across calls
+        if subtitle_generator is None:
+            subtitle_generator = SubtitleGenerator(model_name=model_name, max_words_per_subtitle=max_words, batch_size=batch_size, compute_type=compute_type, vad_filter=vad_filter, num_gpus=num_gpus)
+        subtitle_generator.load_model()
+        
+        if subtitle_generator.num_workers > 1:
+            # One worker thread per GPU; each decodes and transcribes its own videos,
+            # so audio decoding on one thread overlaps with inference on the others
+            print(f"Transcribing on {subtitle_generator.num_workers} GPUs in parallel.")
+            # Start with the longest videos (file size as a cheap duration estimate) so a long
+            # video picked up last doesn't keep one GPU busy while the others sit idle
+            pending_videos.sort(key=lambda video: os.path.getsize(video[0]), reverse=True)
+            with ThreadPoolExecutor(max_workers=subtitle_generator.num_workers) as executor:
+                futures = [
+                    executor.submit(_transcribe_video, subtitle_generator, video_path, subtitle_path, generate_word_timings)
+                    for video_path, subtitle_path in pending_videos
+                ]
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Generating subtitles"):
+                    if future.result():
+                        successful_videos += 1
+        else:
+            # Process each video file, decoding the next video's audio in the background
+            # while the current one is being transcribed
+            with ThreadPoolExecutor(max_workers=1) as audio_loader:
+                next_audio = audio_loader.submit(subtitle_generator.load_audio, pending_videos[0][0])
+                
+                for i, (video_path, subtitle_path) in enumerate(tqdm(pending_videos, desc="Generating subtitles")):
+                    current_audio = next_audio
+                    if i + 1 < len(pending_videos):
+                        next_audio = audio_loader.submit(subtitle_generator.load_audio, pending_videos[i + 1][0])
+                    
+                    try:
+                        audio = current_audio.result()
+                    except Exception as e:
+                        print(f"Error decoding audio for {os.path.basename(video_path)}: {str(e)}")
+                        continue
+                    
+                    # Generate subtitle
+                    if subtitle_generator.generate_subtitle(video_path, subtitle_path, generate_word_timings=generate_word_timings, audio=audio):
+                        successful_videos += 1
         
         print(f"Subtitle generation completed. Successfully processed {successful_videos}/{len(video_files)} videos.")
         return successful_videos > 0
@@ -269,13 +453,17 @@ def process_folder(input_folder, output_folder=None, generate_word_timings=False
         return False
 
 def main():
-    parser = argparse.ArgumentParser(description="Generate subtitles for videos using OpenAI's Whisper")
+    parser = argparse.ArgumentParser(description="Generate subtitles for videos using Whisper (faster-whisper backend)")
     parser.add_argument("input_folder", help="Path to folder containing video files")
-    parser.add_argument("--model", choices=["tiny", "base", "small", "medium", "large"], default="base", help="Whisper model to use (default: base)")
+    parser.add_argument("--model", default="base", help="Whisper model size (tiny, base, small, medium, large) or path to a CTranslate2 model directory (default: base)")
     parser.add_argument("--output_folder", help="Path to output folder for subtitles (default: subtitle_output)", default=None)
     parser.add_argument("--max_words", type=int, default=8, help="Maximum number of words per subtitle (default: 12)")
     parser.add_argument("--word_timings", action="store_true", help="Generate word-level timing data for highlighting")
     parser.add_argument("--extensions", nargs="+", default=[".mp4", ".avi", ".mov", ".mkv", ".webm"], help="Video file extensions to process (default: .mp4 .avi .mov .mkv .webm)")
+    parser.add_argument("--batch_size", type=int, default=16, help="Batch size for batched Whisper inference (default: 16)")
+    parser.add_argument("--compute_type", choices=["float16", "int8_float16", "int8", "float32"], default=None, help="Model precision (default: float16 on GPU, int8 on CPU)")
+    parser.add_argument("--num_gpus", type=int, default=1, help="Number of GPUs to transcribe on in parallel, one video per GPU at a time; 0 uses every visible GPU (default: 1)")
+    parser.add_argument("--no_vad", action="store_true", help="Transcribe the full audio instead of only the speech regions detected by VAD")
     args = parser.parse_args()
     
     # Process videos
@@ -286,7 +474,11 @@ def main():
         args.word_timings,
         args.model,
         args.max_words,
-        args.extensions
+        args.extensions,
+        args.batch_size,
+        compute_type=args.compute_type,
+        vad_filter=not args.no_vad,
+        num_gpus=args.num_gpus
     )
     end_time = time.time()
     